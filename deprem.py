@@ -2,13 +2,17 @@
 # Tek dosya — Deprem Gözlem
 
 from __future__ import annotations
-import os, sys, json, time, sqlite3, tempfile, csv, logging, hashlib, secrets
-from typing import List, Dict, Any, Optional, Tuple
+import os, sys, re, json, time, math, calendar, sqlite3, tempfile, csv, logging, hashlib, secrets, threading, argparse, signal, shutil, atexit
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from array import array
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Tuple, NamedTuple
 
 import requests
 
 # PySide6
-from PySide6.QtCore import Qt, QTimer, QDate, QUrl, QSize, QRegularExpression, QThread, QObject, Signal
+from PySide6.QtCore import Qt, QTimer, QDate, QUrl, QSize, QRegularExpression, QThread, QObject, Signal, QBuffer, QIODevice
 from PySide6.QtGui import QIcon, QAction, QStandardItemModel, QStandardItem
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
@@ -21,7 +25,7 @@ from PySide6.QtCore import QSortFilterProxyModel
 # WebEngine
 try:
     from PySide6.QtWebEngineWidgets import QWebEngineView
-    from PySide6.QtWebEngineCore import QWebEngineSettings
+    from PySide6.QtWebEngineCore import QWebEngineSettings, QWebEngineUrlScheme, QWebEngineUrlSchemeHandler, QWebEngineUrlRequestJob
     HAS_WEBENGINE = True
 except Exception:
     HAS_WEBENGINE = False
@@ -37,10 +41,19 @@ except ImportError:
 try:
     import folium
     from folium.plugins import MarkerCluster, HeatMap
+    from branca.element import MacroElement
+    from jinja2 import Template
     HAS_FOLIUM = True
 except Exception:
     HAS_FOLIUM = False
 
+# NumPy (grafikler ve sunucu tarafı kümeleme)
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
 # Matplotlib
 try:
     from matplotlib.figure import Figure
@@ -68,13 +81,30 @@ APP_DIR = os.path.abspath(os.path.dirname(__file__)) if "__file__" in globals()
 DB_PATH = os.path.join(APP_DIR, "deprem.db")
 SETTINGS_FILE = os.path.join(APP_DIR, "settings.json")
 LOG_FILE = os.path.join(APP_DIR, "app.log")
+DAEMON_STATUS_FILE = os.path.join(APP_DIR, "daemon_status.json")
 SOUND_FILE = os.path.join(APP_DIR, "new_earthquake.wav")
+TILES_DB_PATH = os.path.join(APP_DIR, "tiles.db")
+ASSETS_DIR = os.path.join(APP_DIR, "assets")  # `deprem.py assets` ile doldurulan CDN aynası (ana makine/yol)
 
 DEFAULT_SETTINGS = {
     "theme": "dark",
     "mag_threshold_for_notification": 5.5,
     "auto_refresh_minutes": 5,
-    "map_min_mag": 0.0
+    "map_min_mag": 0.0,
+    "map_geojson": True,
+    "map_cache_mb": 64,
+    "map_cache_spill": True,
+    "tile_cache": True,
+    "tile_cache_mb": 512,
+    "event_store_capacity": 1000,
+    "archive_settle_hours": 48,
+    "poll_min_seconds": 30,
+    "poll_hot_mag": 4.5,
+    "poll_hot_rate": 10,
+    "poll_window_minutes": 60,
+    "poll_decay": 1.5,
+    "poll_error_max_minutes": 30,
+    "poll_jitter": 0.1
 }
 
 API_HEADERS = {"User-Agent": "DepremTakipApp/1.0 (Python PySide6)"}
@@ -111,138 +141,2251 @@ def save_settings(s: Dict[str, Any]) -> None:
     except Exception:
         pass
 
-def api_get(url: str, params: Dict[str, Any] | None = None) -> List[Dict[str, Any]]:
+def pid_alive(pid: int) -> bool:
+    """Süreç çalışıyor mu. Windows'ta os.kill(pid, 0) sinyal 0'ı CTRL_C_EVENT olarak gönderir; orada OpenProcess kullanılır."""
+    if pid <= 0: return False
+    if os.name == "nt":
+        import ctypes
+        from ctypes import wintypes
+        k32 = ctypes.WinDLL("kernel32", use_last_error=True); k32.OpenProcess.restype = wintypes.HANDLE
+        h = k32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not h: return ctypes.get_last_error() == 5  # ERROR_ACCESS_DENIED: süreç var, erişim yok
+        try:
+            code = wintypes.DWORD()
+            return bool(k32.GetExitCodeProcess(h, ctypes.byref(code))) and code.value == 259  # STILL_ACTIVE
+        finally:
+            k32.CloseHandle(h)
     try:
-        r = requests.get(url, params=params, headers=API_HEADERS, timeout=20)
-        r.raise_for_status()
-        js = r.json()
-        if isinstance(js, dict) and "result" in js and isinstance(js["result"], list):
+        os.kill(pid, 0)
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+class ApiError(Exception):
+    """API'ye ulaşılamadı ya da beklenmeyen yanıt geldi (boş sonuçtan farklıdır)."""
+
+@dataclass
+class ApiCallStats:
+    url: str
+    status: int = 0
+    seconds: float = 0.0
+    bytes: int = 0
+    attempts: int = 0
+    not_modified: bool = False
+
+class JsonResultStream:
+    """{"...": ..., "result": [ {...}, ... ]} (ya da üst düzey liste) gövdesinden öğeleri parça parça okur.
+
+    Bellekte yalnızca henüz çözülmemiş tampon ve o anki öğe tutulur; result'tan sonraki anahtarlar okunmaz.
+    """
+    def __init__(self, chunks, key: str = "result"):
+        import codecs
+        self._chunks = iter(chunks); self._dec = codecs.getincrementaldecoder("utf-8")()
+        self._jd = json.JSONDecoder(); self.key = key
+        self._buf = ""; self._pos = 0; self._eof = False
+
+    def _fill(self) -> bool:
+        if self._eof: return False
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self._eof = True; self._buf += self._dec.decode(b"", final=True); return False
+        if self._pos > 65536:
+            self._buf = self._buf[self._pos:]; self._pos = 0
+        self._buf += self._dec.decode(chunk); return True
+
+    def _peek(self) -> str:
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in " \t\r\n":
+                self._pos += 1
+            if self._pos < len(self._buf): return self._buf[self._pos]
+            if not self._fill(): raise ApiError("JSON akışı beklenmedik şekilde bitti")
+
+    def _expect(self, ch: str):
+        if self._peek() != ch: raise ApiError(f"JSON akışı: '{ch}' bekleniyordu, '{self._buf[self._pos]}' geldi")
+        self._pos += 1
+
+    def _value(self) -> Any:
+        self._peek()
+        while True:
+            try:
+                val, end = self._jd.raw_decode(self._buf, self._pos)
+                # Ardından ayraç gelmeyen değer (ör. "2." | "5e3" diye bölünmüş sayı) eksik olabilir; devamı okunur
+                if (end < len(self._buf) and self._buf[end] in ",]}: \t\r\n") or self._eof:
+                    self._pos = end; return val
+            except json.JSONDecodeError:
+                if self._eof: raise ApiError("JSON akışı çözülemedi")
+            self._fill()
+
+    def __iter__(self):
+        if self._peek() == "{":
+            self._pos += 1
+            while True:
+                # get_result ile aynı: result listesi olmayan gövde (ör. status=false hata nesnesi) boş sonuç değildir
+                if self._peek() == "}": raise ApiError(f"Beklenmeyen yanıt biçimi: '{self.key}' listesi yok")
+                k = self._value(); self._expect(":")
+                if k == self.key:
+                    if self._peek() != "[": raise ApiError(f"Beklenmeyen yanıt biçimi: '{self.key}' bir liste değil")
+                    break
+                self._value()
+                if self._peek() == ",": self._pos += 1
+        self._expect("[")
+        if self._peek() == "]": return
+        while True:
+            yield self._value()
+            ch = self._peek(); self._pos += 1
+            if ch == "]": return
+            if ch != ",": raise ApiError(f"JSON akışı: ',' bekleniyordu, '{ch}' geldi")
+
+    def batches(self, size: int):
+        batch = []
+        for item in self:
+            batch.append(item)
+            if len(batch) >= size:
+                yield batch; batch = []
+        if batch: yield batch
+
+class ApiClient:
+    """Bağlantı havuzlu oturum; koşullu GET (ETag / Last-Modified) ve titreşimli üstel geri çekilme ile yeniden deneme."""
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, headers: Dict[str, str] = API_HEADERS, timeout: float = 20, retries: int = 3,
+                 backoff: float = 0.5, backoff_max: float = 8.0, pool_size: int = 8):
+        from requests.adapters import HTTPAdapter
+        self.timeout = timeout; self.retries = retries; self.backoff = backoff; self.backoff_max = backoff_max
+        self.session = requests.Session(); self.session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter); self.session.mount("http://", adapter)
+        self._lock = threading.Lock()
+        self._validators: Dict[Tuple, Tuple[Optional[str], Optional[str], List[Dict[str, Any]]]] = {}
+        self.last_call: Optional[ApiCallStats] = None
+        self.calls = 0; self.total_bytes = 0
+
+    def _sleep_backoff(self, attempt: int, retry_after: Optional[str] = None):
+        import random
+        delay = random.uniform(0, min(self.backoff_max, self.backoff * (2 ** attempt)))
+        try:
+            if retry_after: delay = max(delay, min(self.backoff_max, float(retry_after)))
+        except ValueError:
+            pass
+        time.sleep(delay)
+
+    @staticmethod
+    def _result(js: Any) -> List[Dict[str, Any]]:
+        if isinstance(js, dict) and isinstance(js.get("result"), list):
             return js["result"]
         if isinstance(js, list):
             return js
+        raise ApiError("Beklenmeyen yanıt biçimi")
+
+    def _record(self, st: ApiCallStats, t0: float):
+        st.seconds = time.perf_counter() - t0
+        with self._lock:
+            self.last_call = st; self.calls += 1; self.total_bytes += st.bytes
+
+    def _fail(self, st: ApiCallStats, t0: float, ex: Optional[Exception]) -> ApiError:
+        self._record(st, t0)
+        logger.info(f"API error {st.url}: {ex} ({st.attempts} deneme, {st.seconds*1000:.0f} ms)")
+        err = ApiError(f"{st.url}: {ex}"); err.__cause__ = ex
+        return err
+
+    def get_result(self, url: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        key = (url, tuple(sorted((params or {}).items())))
+        with self._lock: cached = self._validators.get(key)
+        headers = {}
+        if cached:
+            if cached[0]: headers["If-None-Match"] = cached[0]
+            if cached[1]: headers["If-Modified-Since"] = cached[1]
+        st = ApiCallStats(url); t0 = time.perf_counter(); last_ex: Optional[Exception] = None
+        for attempt in range(self.retries + 1):
+            st.attempts = attempt + 1; retry_after = None
+            try:
+                r = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as ex:
+                last_ex = ex
+            except requests.RequestException as ex:
+                raise self._fail(st, t0, ex)
+            else:
+                st.status = r.status_code; st.bytes += len(r.content)
+                if r.status_code == 304 and cached:
+                    st.not_modified = True; result = cached[2]
+                elif r.status_code in self.RETRY_STATUSES:
+                    last_ex = ApiError(f"HTTP {r.status_code}"); retry_after = r.headers.get("Retry-After")
+                    result = None
+                elif r.status_code >= 400:
+                    raise self._fail(st, t0, ApiError(f"HTTP {r.status_code}"))
+                else:
+                    try: result = self._result(r.json())
+                    except (ValueError, ApiError) as ex: raise self._fail(st, t0, ex)
+                    etag, lm = r.headers.get("ETag"), r.headers.get("Last-Modified")
+                    if etag or lm:
+                        with self._lock: self._validators[key] = (etag, lm, result)
+                if result is not None:
+                    self._record(st, t0)
+                    logger.info(f"API {url} {st.status}: {st.seconds*1000:.0f} ms, {st.bytes} B, {st.attempts} deneme")
+                    return result
+            if attempt < self.retries: self._sleep_backoff(attempt, retry_after)
+        raise self._fail(st, t0, last_ex)
+
+    def stream_result(self, url: str, params: Optional[Dict[str, Any]] = None, batch_size: int = 500):
+        """Sonuç listesini batch_size'lık parçalar halinde üretir; yanıt gövdesi bütünüyle belleğe alınmaz.
+        Yeniden deneme yalnızca ilk bayt gelmeden önce yapılır."""
+        st = ApiCallStats(url); t0 = time.perf_counter(); last_ex: Optional[Exception] = None; r = None
+        for attempt in range(self.retries + 1):
+            st.attempts = attempt + 1; retry_after = None
+            try:
+                r = self.session.get(url, params=params, timeout=self.timeout, stream=True)
+            except (requests.ConnectionError, requests.Timeout) as ex:
+                last_ex = ex
+            except requests.RequestException as ex:
+                raise self._fail(st, t0, ex)
+            else:
+                st.status = r.status_code
+                if r.status_code in self.RETRY_STATUSES:
+                    last_ex = ApiError(f"HTTP {r.status_code}"); retry_after = r.headers.get("Retry-After"); r.close(); r = None
+                elif r.status_code >= 400:
+                    r.close(); raise self._fail(st, t0, ApiError(f"HTTP {r.status_code}"))
+                else:
+                    break
+            if attempt < self.retries: self._sleep_backoff(attempt, retry_after)
+        if r is None:
+            raise self._fail(st, t0, last_ex)
+        def counted():
+            for chunk in r.iter_content(chunk_size=65536):
+                st.bytes += len(chunk); yield chunk
+        try:
+            yield from JsonResultStream(counted()).batches(batch_size)
+        except ApiError as ex:
+            raise self._fail(st, t0, ex)
+        except requests.RequestException as ex:
+            raise self._fail(st, t0, ex)
+        finally:
+            r.close()
+        self._record(st, t0)
+        logger.info(f"API akış {url} {st.status}: {st.seconds*1000:.0f} ms, {st.bytes} B")
+
+API_CLIENT = ApiClient()
+
+def api_get(url: str, params: Dict[str, Any] | None = None) -> List[Dict[str, Any]]:
+    """Sonuç listesini döndürür; ağ/HTTP/biçim hatalarında ApiError fırlatır."""
+    return API_CLIENT.get_result(url, params)
+
+def fetch_live_earthquakes() -> List[Dict[str, Any]]:
+    return api_get(API_LIVE)
+
+def stream_archive_earthquakes(date_yyyy_mm_dd: str, batch_size: int = 500):
+    return API_CLIENT.stream_result(API_ARCHIVE, params={"date": date_yyyy_mm_dd}, batch_size=batch_size)
+
+def mag_to_color(m: float) -> str:
+    if m >= 7: return "darkred"
+    if m >= 6: return "red"
+    if m >= 5: return "orange"
+    if m >= 4: return "yellow"
+    if m >= 3: return "lightgreen"
+    return "blue"
+
+def eq_popup_html(e: "Earthquake") -> str:
+    return f"""
+        <b>Büyüklük:</b> M{e.mag:.1f}<br>
+        <b>Konum:</b> {e.title}<br>
+        <b>Tarih:</b> {e.date}<br>
+        <b>Derinlik:</b> {e.depth:.1f} km
+    """
+
+def play_sound_effect(sound_file):
+    if not HAS_QT_SOUND:
+        logger.warning("QSoundEffect kütüphanesi bulunamadı.")
+        return
+    if not os.path.exists(sound_file):
+        logger.warning(f"Ses dosyası bulunamadı: {sound_file}")
+        return
+    
+    try:
+        effect = QSoundEffect()
+        effect.setSource(QUrl.fromLocalFile(sound_file))
+        effect.setLoopCount(1)
+        effect.setVolume(1.0)
+        effect.play()
     except Exception as ex:
-        logger.info(f"API error {url}: {ex}")
-    return []
+        logger.error(f"Ses çalınırken hata oluştu: {ex}")
+
+# ------------------------
+# Deprem kaydı
+# ------------------------
+TR_UTC_OFFSET = 3 * 3600  # Türkiye 2016 sonbaharından beri kalıcı UTC+3
+_TR_TZ: Any = None
+
+def _tr_utc_offset(y: int, mo: int, d: int, h: int, mi: int) -> int:
+    global _TR_TZ
+    if y >= 2017: return TR_UTC_OFFSET
+    if _TR_TZ is None:
+        try:
+            from zoneinfo import ZoneInfo
+            _TR_TZ = ZoneInfo("Europe/Istanbul")
+        except Exception:
+            _TR_TZ = False
+    if not _TR_TZ: return TR_UTC_OFFSET
+    import datetime as _dt
+    return int(_dt.datetime(y, mo, d, h, mi, tzinfo=_TR_TZ).utcoffset().total_seconds())
+
+def parse_event_ts(date_str: Optional[str], fallback: Optional[int] = None) -> Optional[int]:
+    """Kandilli yerel saatini ("YYYY.MM.DD HH:MM:SS" ya da "YYYY-MM-DD HH:MM:SS") UTC epoch saniyeye çevirir."""
+    try:
+        s = date_str.strip()
+        y, mo, d = int(s[0:4]), int(s[5:7]), int(s[8:10])
+        h, mi = int(s[11:13]), int(s[14:16]); sec = int(s[17:19]) if len(s) >= 19 else 0
+        return calendar.timegm((y, mo, d, h, mi, sec)) - _tr_utc_offset(y, mo, d, h, mi)
+    except Exception:
+        return int(fallback) if fallback is not None else None
+
+class Earthquake(NamedTuple):
+    """Tek bir depremin normalize edilmiş, değişmez kaydı. API kaydından ya da DB satırından bir kez üretilir.
+
+    Alan sırası earthquakes tablosuyla aynıdır (airports_json hariç); havalimanları earthquake_airports'tadır.
+    """
+    earthquake_id: str
+    provider: str
+    title: str
+    date: str
+    mag: float
+    depth: float
+    lon: float
+    lat: float
+    created_at: int
+    city_name: Optional[str]
+    city_code: Optional[int]
+    city_distance: Optional[float]
+    city_population: Optional[int]
+    epicenter: Optional[str]
+    event_ts: Optional[int]
+
+    @classmethod
+    def from_api(cls, e: Dict[str, Any], now: Optional[int] = None) -> "Earthquake":
+        geo = (e.get("geojson") or {}).get("coordinates") or (0, 0)
+        lp = e.get("location_properties") or {}
+        cc = lp.get("closestCity") or {}
+        date = e.get("date") or e.get("date_time") or ""
+        created_at = int(e.get("created_at") or now or time.time())
+        return cls(
+            e.get("earthquake_id") or "", e.get("provider") or "", e.get("title") or "", date,
+            float(e.get("mag") or 0), float(e.get("depth") or 0),
+            float(geo[0]) if len(geo) > 0 else 0.0, float(geo[1]) if len(geo) > 1 else 0.0,
+            created_at, cc.get("name"), cc.get("cityCode"), cc.get("distance"), cc.get("population"),
+            (lp.get("epiCenter") or {}).get("name"), parse_event_ts(date, created_at),
+        )
+
+    @classmethod
+    def from_row(cls, row: Tuple) -> "Earthquake":
+        # row: RECORD_COLUMNS sırasında DB satırı
+        return tuple.__new__(cls, row)
+
+    def as_row(self, airports_json: str = "[]") -> Tuple:
+        return self[:14] + (airports_json, self.event_ts)
+
+RECORD_COLUMNS = ("earthquake_id", "provider", "title", "date", "mag", "depth", "lon", "lat", "created_at",
+                  "closestCity_name", "closestCity_code", "closestCity_distance", "closestCity_population",
+                  "epiCenter_name", "event_ts")
+
+# ------------------------
+# SQLite
+# ------------------------
+DB_BATCH_SIZE = 5000
+
+_DB_LOCAL = threading.local()
+
+def db_connect() -> sqlite3.Connection:
+    # İş parçacığı başına tek bağlantı (WAL + synchronous=NORMAL); işlemler açıkça BEGIN/COMMIT ile yönetilir
+    cons = getattr(_DB_LOCAL, "cons", None)
+    if cons is None:
+        cons = _DB_LOCAL.cons = {}
+    con = cons.get(DB_PATH)
+    if con is None:
+        # timeout: daemon ve arayüz aynı dosyaya yazabilir; kilit beklenir
+        con = sqlite3.connect(DB_PATH, isolation_level=None, timeout=30)
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=NORMAL")
+        con.execute("PRAGMA temp_store=MEMORY")
+        cons[DB_PATH] = con
+    return con
+
+# Şema göçleri: listedeki sıra + 1 = PRAGMA user_version. Yalnızca sona ekleyin.
+def _mig_base(con: sqlite3.Connection):
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS earthquakes(
+            earthquake_id TEXT PRIMARY KEY,
+            provider TEXT,
+            title TEXT,
+            date TEXT,
+            mag REAL,
+            depth REAL,
+            lon REAL,
+            lat REAL,
+            created_at INTEGER,
+            closestCity_name TEXT,
+            closestCity_code INTEGER,
+            closestCity_distance REAL,
+            closestCity_population INTEGER,
+            epiCenter_name TEXT,
+            airports_json TEXT
+        )
+    """)
+
+def _mig_content_hash(con: sqlite3.Connection):
+    cols = {r[1] for r in con.execute("PRAGMA table_info(earthquakes)")}
+    if "content_hash" not in cols:
+        con.execute("ALTER TABLE earthquakes ADD COLUMN content_hash TEXT")
+
+def _mig_indexes(con: sqlite3.Connection):
+    # date "YYYY.MM.DD HH:MM:SS" biçiminde olduğundan metin sırası zaman sırasıdır
+    con.execute("CREATE INDEX IF NOT EXISTS idx_eq_created_at ON earthquakes(created_at)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_eq_mag ON earthquakes(mag)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_eq_date ON earthquakes(date)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_eq_city ON earthquakes(closestCity_code)")
+
+def _mig_rtree(con: sqlite3.Connection):
+    # earthquakes.rowid ile eşleşir (_mig_stable_rowid'den sonra rid takma adı, VACUUM'da sabit); upsert yolu tetikleyicilerle senkron tutar
+    con.execute("CREATE VIRTUAL TABLE IF NOT EXISTS earthquakes_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon)")
+    con.execute("INSERT OR REPLACE INTO earthquakes_rtree SELECT rowid, lat, lat, lon, lon FROM earthquakes")
+    # Tetikleyici içindeki OR REPLACE dıştaki upsert tarafından geçersiz kılınır; silme tetikleyicisi id'yi boşaltır
+    con.execute("""CREATE TRIGGER IF NOT EXISTS trg_eq_rtree_ins AFTER INSERT ON earthquakes BEGIN
+        INSERT INTO earthquakes_rtree VALUES (new.rowid, new.lat, new.lat, new.lon, new.lon); END""")
+    con.execute("""CREATE TRIGGER IF NOT EXISTS trg_eq_rtree_upd AFTER UPDATE OF lat, lon ON earthquakes BEGIN
+        UPDATE earthquakes_rtree SET min_lat = new.lat, max_lat = new.lat, min_lon = new.lon, max_lon = new.lon
+        WHERE id = new.rowid; END""")
+    con.execute("""CREATE TRIGGER IF NOT EXISTS trg_eq_rtree_del AFTER DELETE ON earthquakes BEGIN
+        DELETE FROM earthquakes_rtree WHERE id = old.rowid; END""")
+
+def _mig_event_ts(con: sqlite3.Connection):
+    cols = {r[1] for r in con.execute("PRAGMA table_info(earthquakes)")}
+    if "event_ts" not in cols:
+        con.execute("ALTER TABLE earthquakes ADD COLUMN event_ts INTEGER")
+    con.create_function("parse_event_ts", 2, parse_event_ts, deterministic=True)
+    con.execute("UPDATE earthquakes SET event_ts = parse_event_ts(date, created_at) WHERE event_ts IS NULL")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_eq_event_ts ON earthquakes(event_ts)")
+
+def _mig_airports(con: sqlite3.Connection):
+    # airports_json uyumluluk için kalır; sorgular bu alt tabloyu kullanır
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS earthquake_airports(
+            earthquake_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            name TEXT,
+            code TEXT,
+            distance_m REAL,
+            PRIMARY KEY(earthquake_id, seq)
+        ) WITHOUT ROWID
+    """)
+    con.execute("CREATE INDEX IF NOT EXISTS idx_airport_name ON earthquake_airports(name, distance_m)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_airport_code ON earthquake_airports(code, distance_m)")
+    con.execute("""
+        INSERT OR REPLACE INTO earthquake_airports
+        SELECT e.earthquake_id, j.key, json_extract(j.value, '$.name'), json_extract(j.value, '$.code'), json_extract(j.value, '$.distance')
+        FROM earthquakes e, json_each(e.airports_json) j
+        WHERE json_valid(e.airports_json) AND json_type(e.airports_json) = 'array'
+    """)
+    con.execute("""CREATE TRIGGER IF NOT EXISTS trg_eq_airports_del AFTER DELETE ON earthquakes BEGIN
+        DELETE FROM earthquake_airports WHERE earthquake_id = old.earthquake_id; END""")
+
+def _mig_event_key(con: sqlite3.Connection):
+    # Sayfalama anahtarı (event_ts, earthquake_id); tek sütunlu event_ts indeksi bunun önekidir
+    con.execute("CREATE INDEX IF NOT EXISTS idx_eq_event_key ON earthquakes(event_ts, earthquake_id)")
+    con.execute("DROP INDEX IF EXISTS idx_eq_event_ts")
+
+def _mig_archive_days(con: sqlite3.Connection):
+    # Arşiv günü defteri: status 'done' | 'failed'. Gün sonu + yerleşme süresinden sonra çekilmiş 'done' gün kesindir.
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS archive_days(
+            day TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            record_count INTEGER,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            fetched_at INTEGER,
+            error TEXT
+        )
+    """)
+
+def _mig_hash_backfill(con: sqlite3.Connection):
+    # content_hash sütunu boş eklenmişti; eski satırların özeti burada hesaplanır, yoksa ilk upsert hepsini "güncel" sayıp yeniden yazar
+    cols = ", ".join(EQ_COLUMNS[:15]); last = ""
+    while True:
+        rows = con.execute(f"SELECT {cols} FROM earthquakes WHERE earthquake_id > ? AND content_hash IS NULL "
+                           "ORDER BY earthquake_id LIMIT 5000", (last,)).fetchall()
+        if not rows:
+            break
+        con.executemany("UPDATE earthquakes SET content_hash = ? WHERE earthquake_id = ?", ((row_digest(r), r[0]) for r in rows))
+        last = rows[-1][0]
+
+def _mig_stable_rowid(con: sqlite3.Connection):
+    # TEXT PRIMARY KEY tablosunda rowid örtüktür ve VACUUM onu yeniden numaralandırabilir; R-tree ve küme dizini rowid'e bağlıdır.
+    # Tablo, rowid'in takma adı olan rid sütunuyla yeniden kurulur (mevcut rowid'ler aynen taşınır); indeks ve tetikleyiciler geri yüklenir.
+    extras = [r[0] for r in con.execute("SELECT sql FROM sqlite_master WHERE tbl_name = 'earthquakes' AND type IN ('index', 'trigger') AND sql IS NOT NULL")]
+    info = [(r[1], r[2]) for r in con.execute("PRAGMA table_info(earthquakes)")]
+    defs = ", ".join(f"{n} {t} UNIQUE" if n == "earthquake_id" else f"{n} {t}" for n, t in info)
+    cols = ", ".join(n for n, _ in info)
+    con.execute(f"CREATE TABLE earthquakes_new({defs}, rid INTEGER PRIMARY KEY)")
+    con.execute(f"INSERT INTO earthquakes_new({cols}, rid) SELECT {cols}, rowid FROM earthquakes")
+    con.execute("DROP TABLE earthquakes")
+    con.execute("ALTER TABLE earthquakes_new RENAME TO earthquakes")
+    for sql in extras:
+        con.execute(sql)
+
+def _mig_revision(con: sqlite3.Connection):
+    # Var olan olayın konumu/büyüklüğü/zamanı değişince ya da olay silinince artan sayaç. Yalnızca eklemeler rowid ile
+    # izlenebilir; güncellemeyi hangi bağlantı ya da süreç (ör. daemon) yazmış olursa olsun küme dizini bunu buradan görür.
+    con.execute("CREATE TABLE IF NOT EXISTS earthquakes_revision(id INTEGER PRIMARY KEY CHECK (id = 0), n INTEGER NOT NULL)")
+    con.execute("INSERT OR IGNORE INTO earthquakes_revision VALUES (0, 0)")
+    con.execute("""CREATE TRIGGER IF NOT EXISTS trg_eq_revision_upd AFTER UPDATE OF lat, lon, mag, event_ts ON earthquakes
+        WHEN old.lat IS NOT new.lat OR old.lon IS NOT new.lon OR old.mag IS NOT new.mag OR old.event_ts IS NOT new.event_ts BEGIN
+        UPDATE earthquakes_revision SET n = n + 1; END""")
+    con.execute("""CREATE TRIGGER IF NOT EXISTS trg_eq_revision_del AFTER DELETE ON earthquakes BEGIN
+        UPDATE earthquakes_revision SET n = n + 1; END""")
+
+DB_MIGRATIONS = [_mig_base, _mig_content_hash, _mig_indexes, _mig_rtree, _mig_event_ts, _mig_airports, _mig_event_key,
+                 _mig_archive_days, _mig_hash_backfill, _mig_stable_rowid, _mig_revision]
+
+def db_migrate(con: sqlite3.Connection, target: Optional[int] = None) -> int:
+    ver = con.execute("PRAGMA user_version").fetchone()[0]
+    target = len(DB_MIGRATIONS) if target is None else target
+    for v in range(ver + 1, target + 1):
+        mig = DB_MIGRATIONS[v - 1]
+        con.execute("BEGIN")
+        try:
+            mig(con); con.execute(f"PRAGMA user_version={v}")
+            con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK"); raise
+        logger.info(f"DB şeması v{v} ({mig.__name__})")
+        ver = v
+    return ver
+
+def db_init():
+    db_migrate(db_connect())
+
+_UPSERT_SQL = """
+    INSERT INTO earthquakes
+    (earthquake_id, provider, title, date, mag, depth, lon, lat, created_at,
+     closestCity_name, closestCity_code, closestCity_distance, closestCity_population,
+     epiCenter_name, airports_json, event_ts, content_hash)
+    VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+    ON CONFLICT(earthquake_id) DO UPDATE SET
+      provider=excluded.provider,
+      title=excluded.title,
+      date=excluded.date,
+      mag=excluded.mag,
+      depth=excluded.depth,
+      lon=excluded.lon,
+      lat=excluded.lat,
+      created_at=excluded.created_at,
+      closestCity_name=excluded.closestCity_name,
+      closestCity_code=excluded.closestCity_code,
+      closestCity_distance=excluded.closestCity_distance,
+      closestCity_population=excluded.closestCity_population,
+      epiCenter_name=excluded.epiCenter_name,
+      airports_json=excluded.airports_json,
+      event_ts=excluded.event_ts,
+      content_hash=excluded.content_hash
+"""
+
+@dataclass
+class IngestStats:
+    rows: int = 0
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    skipped: int = 0
+    inserted_ids: List[str] = field(default_factory=list)
+    updated_ids: List[str] = field(default_factory=list)
+    seconds: float = 0.0
+    batch_rates: List[float] = field(default_factory=list)
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+def eq_to_row(e: Dict[str, Any], now: Optional[int] = None) -> Tuple:
+    """API kaydını earthquakes tablosunun sütun sırasında bir demete çevirir."""
+    airports = (e.get("location_properties") or {}).get("airports") or []
+    return Earthquake.from_api(e, now).as_row(json.dumps(airports, ensure_ascii=False))
+
+def airport_rows(gid: str, e: Dict[str, Any]) -> List[Tuple]:
+    airports = (e.get("location_properties") or {}).get("airports") or []
+    return [(gid, i, a.get("name"), a.get("code"), float(a.get("distance") or 0)) for i, a in enumerate(airports) if isinstance(a, dict)]
+
+def row_digest(row: Tuple) -> str:
+    # created_at kayıt zamanı, event_ts date'ten türetilir; ikisi de içerik sayılmaz
+    return hashlib.blake2b("\x1f".join(map(str, row[:8] + row[9:15])).encode("utf-8"), digest_size=16).hexdigest()
+
+# Başarılı her yazımdan sonra IngestStats ile çağrılır (yazan iş parçacığında)
+INGEST_LISTENERS: List[Any] = []
+
+def _stored_hashes(con: sqlite3.Connection, ids: List[str]) -> Dict[str, Optional[str]]:
+    # Yalnızca gelen id'ler için PK bakışı; çağıran yazma kilidini tutar (BEGIN IMMEDIATE), bakış ile COMMIT arasında başka yazar giremez
+    out: Dict[str, Optional[str]] = {}
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i+500]
+        out.update(con.execute(f"SELECT earthquake_id, content_hash FROM earthquakes WHERE earthquake_id IN ({','.join('?'*len(chunk))})", chunk))
+    return out
+
+def normalize_earthquakes(items: List[Dict[str, Any]], now: Optional[int] = None) -> Tuple[Dict[str, Tuple[Tuple, Dict[str, Any]]], int]:
+    """API kayıtlarını DB satırlarına çevirir: (earthquake_id -> (satır, ham kayıt), atlanan sayısı); aynı id'de son gelen kazanır."""
+    now = int(time.time()) if now is None else now
+    latest: Dict[str, Tuple[Tuple, Dict[str, Any]]] = {}; skipped = 0
+    for e in items:
+        try:
+            row = eq_to_row(e, now); latest[row[0]] = (row, e)
+        except Exception as ex:
+            skipped += 1; logger.info(f"DB upsert error: {ex}")
+    return latest, skipped
+
+def db_upsert_earthquakes(items: List[Dict[str, Any]], batch_size: int = DB_BATCH_SIZE) -> IngestStats:
+    t0 = time.perf_counter(); latest, skipped = normalize_earthquakes(items)
+    return db_upsert_normalized(latest, skipped, batch_size, t0)
+
+def db_upsert_normalized(latest: Dict[str, Tuple[Tuple, Dict[str, Any]]], skipped: int = 0,
+                         batch_size: int = DB_BATCH_SIZE, t0: Optional[float] = None) -> IngestStats:
+    """normalize_earthquakes çıktısını yazar; yalnızca yeni ve içeriği değişen satırlar diske gider."""
+    stats = IngestStats(skipped=skipped); t0 = time.perf_counter() if t0 is None else t0
+    if not latest:
+        return stats
+    con = db_connect()
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        hc = _stored_hashes(con, list(latest)); rows = []; airports = []
+        for gid, (row, e) in latest.items():
+            h = row_digest(row)
+            if gid not in hc:
+                stats.inserted_ids.append(gid)
+            elif hc[gid] != h:
+                stats.updated_ids.append(gid)
+            else:
+                stats.unchanged += 1; continue
+            rows.append(row + (h,)); airports.extend(airport_rows(gid, e))
+        for i in range(0, len(rows), batch_size):
+            tb = time.perf_counter(); batch = rows[i:i+batch_size]
+            con.executemany(_UPSERT_SQL, batch)
+            stats.batch_rates.append(len(batch) / max(time.perf_counter() - tb, 1e-9))
+        con.executemany("DELETE FROM earthquake_airports WHERE earthquake_id = ?", ((gid,) for gid in stats.updated_ids))
+        con.executemany("INSERT OR REPLACE INTO earthquake_airports VALUES (?,?,?,?,?)", airports)
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK"); raise
+    stats.inserted = len(stats.inserted_ids); stats.updated = len(stats.updated_ids)
+    stats.rows = len(rows); stats.seconds = time.perf_counter() - t0
+    logger.info(f"DB upsert: {stats.inserted} yeni, {stats.updated} güncel, {stats.unchanged} değişmedi, {stats.rows_per_sec:.0f} kayıt/sn")
+    if rows:
+        for cb in list(INGEST_LISTENERS):
+            try: cb(stats)
+            except Exception as ex: logger.info(f"Ingest listener error: {ex}")
+    return stats
+
+EQ_COLUMNS = ("earthquake_id", "provider", "title", "date", "mag", "depth", "lon", "lat", "created_at",
+              "closestCity_name", "closestCity_code", "closestCity_distance", "closestCity_population",
+              "epiCenter_name", "airports_json", "event_ts", "content_hash")
+
+class CatalogPager:
+    """(event_ts, earthquake_id) anahtarlı, yeniden eskiye sayfalama. Sayfa maliyeti derinlikten bağımsızdır.
+
+    shape="tuples": columns sırasında demet listesi; shape="columns": sütun adı -> değer listesi;
+    shape="records": Earthquake listesi (columns yok sayılır).
+    """
+    def __init__(self, page_size: int = 200, columns: Tuple[str, ...] = EQ_COLUMNS, shape: str = "tuples",
+                 min_mag: Optional[float] = None, max_mag: Optional[float] = None,
+                 min_depth: Optional[float] = None, max_depth: Optional[float] = None,
+                 time_range: Optional[Tuple[int, int]] = None, city_code: Optional[int] = None):
+        if shape not in ("tuples", "columns", "records"): raise ValueError(f"shape: {shape}")
+        if shape == "records": columns = RECORD_COLUMNS
+        self.page_size = page_size; self.columns = tuple(columns); self.shape = shape
+        where, params = ["event_ts IS NOT NULL"], []
+        for cond, val in (("mag >= ?", min_mag), ("mag <= ?", max_mag), ("depth >= ?", min_depth), ("depth <= ?", max_depth),
+                          ("closestCity_code = ?", city_code)):
+            if val is not None: where.append(cond); params.append(val)
+        if time_range is not None:
+            where.append("event_ts BETWEEN ? AND ?"); params.extend(time_range)
+        self._where = " AND ".join(where); self._params = params
+        self._sql_cols = ", ".join(self.columns) + ", event_ts, earthquake_id"
+        self._first_key: Optional[Tuple[int, str]] = None; self._last_key: Optional[Tuple[int, str]] = None
+        self.has_older = False; self.has_newer = False
+
+    def _query(self, key_cond: str, key: Tuple, ascending: bool) -> List[Tuple]:
+        order = "ASC" if ascending else "DESC"
+        sql = (f"SELECT {self._sql_cols} FROM earthquakes WHERE {self._where}{key_cond} "
+               f"ORDER BY event_ts {order}, earthquake_id {order} LIMIT ?")
+        return db_connect().execute(sql, self._params + list(key) + [self.page_size + 1]).fetchall()
+
+    def _page(self, rows: List[Tuple]):
+        n = len(self.columns)
+        if rows:
+            self._first_key = rows[0][n:]; self._last_key = rows[-1][n:]
+        data = [r[:n] for r in rows]
+        if self.shape == "columns":
+            return {c: [r[i] for r in data] for i, c in enumerate(self.columns)}
+        if self.shape == "records":
+            return [Earthquake.from_row(r) for r in data]
+        return data
+
+    def first(self):
+        rows = self._query("", (), False)
+        self.has_older = len(rows) > self.page_size; self.has_newer = False
+        return self._page(rows[:self.page_size])
+
+    def anchor(self, first_key: Tuple[int, str], last_key: Tuple[int, str], has_older: bool = True):
+        # Sayfayı başka bir kaynaktan (ör. EventStore) gösteren çağıran için konumu ayarlar
+        self._first_key, self._last_key = first_key, last_key
+        self.has_newer = False; self.has_older = has_older
+
+    def older(self):
+        if self._last_key is None: return self.first()
+        rows = self._query(" AND (event_ts, earthquake_id) < (?, ?)", self._last_key, False)
+        if not rows: self.has_older = False; return self._page([])
+        self.has_older = len(rows) > self.page_size; self.has_newer = True
+        return self._page(rows[:self.page_size])
+
+    def newer(self):
+        if self._first_key is None: return self.first()
+        rows = self._query(" AND (event_ts, earthquake_id) > (?, ?)", self._first_key, True)
+        if not rows: self.has_newer = False; return self._page([])
+        self.has_newer = len(rows) > self.page_size; self.has_older = True
+        return self._page(rows[:self.page_size][::-1])
+
+def db_fetch_rows(ids: List[str], columns: Tuple[str, ...] = EQ_COLUMNS) -> List[Tuple]:
+    out = []; con = db_connect()
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i+500]
+        out.extend(con.execute(f"SELECT {', '.join(columns)} FROM earthquakes WHERE earthquake_id IN ({','.join('?'*len(chunk))})", chunk))
+    return out
+
+EARTH_RADIUS_KM = 6371.0088
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def _eq_filters(min_mag: Optional[float], time_range: Optional[Tuple[int, int]]) -> Tuple[str, List[Any]]:
+    where, params = [], []
+    if min_mag is not None:
+        where.append("e.mag >= ?"); params.append(min_mag)
+    if time_range is not None:
+        where.append("e.event_ts BETWEEN ? AND ?"); params.extend(time_range)
+    return "".join(f" AND {w}" for w in where), params
+
+def db_query_bbox(min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+                  min_mag: Optional[float] = None, time_range: Optional[Tuple[int, int]] = None,
+                  limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Kutu içindeki depremler (R*Tree); time_range: (başlangıç, bitiş) epoch saniye."""
+    extra, params = _eq_filters(min_mag, time_range)
+    sql = ("SELECT e.* FROM earthquakes_rtree r JOIN earthquakes e ON e.rowid = r.id "
+           "WHERE r.min_lat <= ? AND r.max_lat >= ? AND r.min_lon <= ? AND r.max_lon >= ?" + extra +
+           " ORDER BY e.event_ts DESC")
+    if limit: sql += f" LIMIT {int(limit)}"
+    cur = db_connect().cursor(); cur.row_factory = sqlite3.Row
+    cur.execute(sql, [max_lat, min_lat, max_lon, min_lon] + params)
+    return [dict(r) for r in cur.fetchall()]
+
+def db_query_radius(lat: float, lon: float, km: float, min_mag: Optional[float] = None,
+                    time_range: Optional[Tuple[int, int]] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Noktaya km yarıçap içindeki depremler, yakından uzağa; her satıra distance_km eklenir."""
+    ang = km / EARTH_RADIUS_KM; dlat = math.degrees(ang)
+    if lat + dlat >= 90 or lat - dlat <= -90:
+        dlon = 180.0  # kutup dairenin içinde: tüm boylamlar
+    else:
+        # Dairenin gerçek boylam genişliği; km / (R cos lat) bunu küçük tahmin eder ve kenardaki olayları düşürür
+        dlon = math.degrees(math.asin(min(1.0, math.sin(ang) / math.cos(math.radians(lat)))))
+    min_lon, max_lon = lon - dlon, lon + dlon
+    if min_lon < -180 or max_lon > 180 or dlon >= 180:
+        min_lon, max_lon = -180.0, 180.0
+    out = []
+    for r in db_query_bbox(max(-90.0, lat - dlat), min_lon, min(90.0, lat + dlat), max_lon, min_mag, time_range):
+        d = haversine_km(lat, lon, r["lat"], r["lon"])
+        if d <= km:
+            r["distance_km"] = d; out.append(r)
+    out.sort(key=lambda r: r["distance_km"])
+    return out[:limit] if limit else out
+
+def db_fetch_airports(ids: List[str]) -> Dict[str, List[Tuple[str, float]]]:
+    """earthquake_id -> [(havalimanı adı, uzaklık km), ...] API sırasıyla."""
+    out: Dict[str, List[Tuple[str, float]]] = {}
+    con = db_connect()
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i+500]
+        for gid, name, dist in con.execute(
+                f"SELECT earthquake_id, name, distance_m FROM earthquake_airports WHERE earthquake_id IN ({','.join('?'*len(chunk))}) ORDER BY earthquake_id, seq", chunk):
+            out.setdefault(gid, []).append((name or "", (dist or 0) / 1000))
+    return out
+
+def db_query_near_airport(airport: str, km: float, min_mag: Optional[float] = None,
+                          time_range: Optional[Tuple[int, int]] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Adı ya da kodu verilen havalimanına km içindeki depremler; her satıra airport_distance_km eklenir."""
+    extra, params = _eq_filters(min_mag, time_range)
+    sql = ("SELECT e.*, a.distance_m / 1000.0 AS airport_distance_km FROM earthquake_airports a JOIN earthquakes e ON e.earthquake_id = a.earthquake_id "
+           "WHERE a.name = ? AND a.distance_m <= ?" + extra +
+           " UNION SELECT e.*, a.distance_m / 1000.0 FROM earthquake_airports a JOIN earthquakes e ON e.earthquake_id = a.earthquake_id "
+           "WHERE a.code = ? AND a.distance_m <= ?" + extra + " ORDER BY event_ts DESC")
+    if limit: sql += f" LIMIT {int(limit)}"
+    cur = db_connect().cursor(); cur.row_factory = sqlite3.Row
+    cur.execute(sql, [airport, km * 1000] + params + [airport, km * 1000] + params)
+    return [dict(r) for r in cur.fetchall()]
+
+def db_bucket_stats(bucket_seconds: int = 86400, time_range: Optional[Tuple[int, int]] = None,
+                    min_mag: Optional[float] = None) -> List[Tuple[int, int, float, float]]:
+    """(kova başlangıcı epoch, adet, ortalama M, en büyük M); kovalar Türkiye yerel saatine hizalıdır."""
+    extra, params = _eq_filters(min_mag, time_range)
+    sql = (f"SELECT ((e.event_ts + {TR_UTC_OFFSET}) / ?) * ? - {TR_UTC_OFFSET} AS b, count(*), avg(e.mag), max(e.mag) "
+           "FROM earthquakes e WHERE e.event_ts IS NOT NULL" + extra + " GROUP BY b ORDER BY b")
+    return db_connect().execute(sql, [bucket_seconds, bucket_seconds] + params).fetchall()
+
+# ------------------------
+# Olay deposu
+# ------------------------
+VIEW_ROWS = 200  # sekmelerin gösterdiği son deprem sayısı
+
+class EventStore:
+    """Son depremlerin (yeniden eskiye) tipli, dizi tabanlı sütunları; tüm sekmeler aynı anlık görüntüyü okur.
+
+    Sayısal sütunlar array olarak tutulur ve col() sıfır kopyalı memoryview döndürür. Her değişiklikte
+    diziler yeniden kurulur, eski görünümler önceki anlık görüntüyü göstermeye devam eder.
+    NULL sayısal değerler: tamsayılarda -1, ondalıklarda NaN (rows() bunları None'a çevirir).
+    """
+    NUMERIC = {"event_ts": "q", "mag": "d", "depth": "d", "lat": "d", "lon": "d", "created_at": "q",
+               "closestCity_code": "q", "closestCity_distance": "d", "closestCity_population": "q"}
+    OBJECT = ("earthquake_id", "provider", "title", "date", "closestCity_name", "epiCenter_name")
+    COLUMNS = OBJECT + tuple(NUMERIC)
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity; self.version = 0; self._data_version = None
+        self._cols: Dict[str, Any] = {}; self._build([])
+        self._pending: set = set(); self._lock = threading.Lock()
+
+    def _build(self, rows: List[Tuple]):
+        cols: Dict[str, Any] = {}
+        for i, c in enumerate(self.COLUMNS):
+            vals = [r[i] for r in rows]
+            tc = self.NUMERIC.get(c)
+            if tc is None:
+                cols[c] = tuple(vals)
+            else:
+                null = -1 if tc == "q" else math.nan
+                cols[c] = array(tc, [null if v is None else v for v in vals])
+        self._cols = cols; self.version += 1
+
+    def load(self):
+        self._data_version = db_connect().execute("PRAGMA data_version").fetchone()[0]
+        self._build(CatalogPager(self.capacity, columns=self.COLUMNS).first())
+        with self._lock: self._pending.clear()
+        # Yalnızca yüklenen (arayüzün okuduğu) depo dinler; daemon/CLI'da sync() çağrılmadığından _pending şişerdi
+        if self._on_ingest not in INGEST_LISTENERS: INGEST_LISTENERS.append(self._on_ingest)
+
+    def poll_external(self) -> bool:
+        """Başka bağlantıların (ör. daemon) işlediği yazımları PRAGMA data_version ile fark eder; değiştiyse yeniden yükler."""
+        if self._data_version == db_connect().execute("PRAGMA data_version").fetchone()[0]:
+            return False
+        self.load(); return True
+
+    def _on_ingest(self, stats: IngestStats):
+        with self._lock: self._pending.update(stats.inserted_ids, stats.updated_ids)
+
+    def sync(self) -> bool:
+        """Bekleyen ingest değişikliklerini uygular (GUI iş parçacığında çağrılır); değişiklik varsa True."""
+        with self._lock:
+            ids = list(self._pending); self._pending.clear()
+        if not ids: return False
+        return self.apply(db_fetch_rows(ids, self.COLUMNS))
+
+    def apply(self, changed: List[Tuple]) -> bool:
+        """COLUMNS sırasındaki değişmiş satırları birleştirir (GUI iş parçacığında); değişiklik varsa True."""
+        if not changed: return False
+        with self._lock: self._pending.difference_update(r[0] for r in changed)
+        merged = {r[0]: r for r in self.rows()}
+        merged.update((r[0], r) for r in changed)
+        ts = self.COLUMNS.index("event_ts")
+        self._build(sorted(merged.values(), key=lambda r: (r[ts] or 0, r[0]), reverse=True)[:self.capacity])
+        return True
+
+    def __len__(self) -> int: return len(self._cols["earthquake_id"])
+
+    def col(self, name: str, n: Optional[int] = None):
+        """Sütunun ilk n elemanı; sayısal sütunlar için kopyasız memoryview."""
+        c = self._cols[name]
+        if name in self.NUMERIC:
+            c = memoryview(c)
+        return c if n is None else c[:n]
+
+    def rows(self, columns: Tuple[str, ...] = COLUMNS, n: Optional[int] = None) -> List[Tuple]:
+        out = []
+        for c in columns:
+            v = self.col(c, n); tc = self.NUMERIC.get(c)
+            if tc == "q": v = [None if x == -1 else x for x in v]
+            elif tc == "d": v = [None if x != x else x for x in v]
+            out.append(v)
+        return list(zip(*out))
+
+    def records(self, n: Optional[int] = None) -> List[Earthquake]:
+        return [Earthquake.from_row(r) for r in self.rows(RECORD_COLUMNS, n)]
+
+EVENT_STORE = EventStore(int(DEFAULT_SETTINGS["event_store_capacity"]))
+
+# ------------------------
+# Arşiv doldurma
+# ------------------------
+def db_mark_archive_day(day: str, status: str, record_count: Optional[int] = None, error: Optional[str] = None):
+    db_connect().execute("""
+        INSERT INTO archive_days(day, status, record_count, attempts, fetched_at, error) VALUES (?,?,?,1,?,?)
+        ON CONFLICT(day) DO UPDATE SET status=excluded.status, record_count=excluded.record_count,
+          attempts=archive_days.attempts+1, fetched_at=excluded.fetched_at, error=excluded.error
+    """, (day, status, record_count, int(time.time()), error))
+
+def archive_day_bounds(day: str) -> Tuple[int, int]:
+    """Türkiye yerel gününün [başlangıç, bitiş) UTC epoch aralığı."""
+    import datetime as _dt
+    start = parse_event_ts(f"{day} 00:00:00")
+    nxt = (_dt.date.fromisoformat(day) + _dt.timedelta(days=1)).isoformat()
+    return start, parse_event_ts(f"{nxt} 00:00:00")
+
+def db_archive_days_final(days: List[str], settle_hours: float = DEFAULT_SETTINGS["archive_settle_hours"]) -> set:
+    """Tamamı çekilmiş ve çekildiği anda yerleşme süresi dolmuş günler; bunlar yerel veriden yanıtlanır."""
+    out = set(); con = db_connect(); settle = int(settle_hours * 3600)
+    for i in range(0, len(days), 500):
+        chunk = days[i:i+500]
+        for day, fetched_at in con.execute(
+                f"SELECT day, fetched_at FROM archive_days WHERE status = 'done' AND day IN ({','.join('?'*len(chunk))})", chunk):
+            if fetched_at and fetched_at >= archive_day_bounds(day)[1] + settle:
+                out.add(day)
+    return out
+
+def db_fetch_day(day: str, min_mag: Optional[float] = None) -> List[Earthquake]:
+    start, end = archive_day_bounds(day)
+    pager = CatalogPager(1_000_000, shape="records", min_mag=min_mag, time_range=(start, end - 1))
+    return pager.first()
+
+def fetch_archive_cached(day: str, settle_hours: float = DEFAULT_SETTINGS["archive_settle_hours"]) -> Tuple[List[Earthquake], bool]:
+    """Kesinleşmiş günleri SQLite'tan, diğerlerini API'den (upsert + defter kaydıyla) getirir. (kayıtlar, önbellekten_mi)"""
+    if day in db_archive_days_final([day], settle_hours):
+        return db_fetch_day(day), True
+    recs: List[Earthquake] = []; now = int(time.time())
+    for batch in stream_archive_earthquakes(day):
+        db_upsert_earthquakes(batch)
+        recs.extend(Earthquake.from_api(e, now) for e in batch)
+    db_mark_archive_day(day, "done", len(recs))
+    return recs, False
+
+@dataclass
+class BackfillReport:
+    days_total: int = 0
+    days_skipped: int = 0
+    days_done: int = 0
+    days_failed: int = 0
+    records: int = 0
+    inserted: int = 0
+    seconds: float = 0.0
+
+    @property
+    def records_per_sec(self) -> float:
+        return self.records / self.seconds if self.seconds > 0 else 0.0
+
+class ArchiveBackfill:
+    """Tarih aralığını günlere bölüp sınırlı bir iş parçacığı havuzuyla çeker.
+
+    Her gün akış olarak parça parça okunur; parçalar sınırlı bir kuyruk üzerinden çağıran iş parçacığına
+    gelir ve orada toplu upsert ile yazılır (tek yazar). Bellek kabaca workers * 2 parça ile sınırlıdır.
+    Her gün archive_days'e işlenir; kesinleşmiş günler sonraki çalıştırmalarda atlanır (force=True hariç).
+    """
+    def __init__(self, start: str, end: str, workers: int = 4, force: bool = False,
+                 stream=None, on_progress=None, settle_hours: float = DEFAULT_SETTINGS["archive_settle_hours"],
+                 batch_size: int = 500):
+        import datetime as _dt
+        d0, d1 = _dt.date.fromisoformat(start), _dt.date.fromisoformat(end)
+        if d1 < d0: d0, d1 = d1, d0
+        self.days = [(d0 + _dt.timedelta(days=i)).isoformat() for i in range((d1 - d0).days + 1)]
+        self.workers = max(1, workers); self.force = force; self.settle_hours = settle_hours
+        self.stream = stream or (lambda day: stream_archive_earthquakes(day, batch_size))
+        self.on_progress = on_progress
+        self._stop = threading.Event()
+
+    def stop(self): self._stop.set()
+
+    def _put(self, q, item) -> bool:
+        import queue
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.2); return True
+            except queue.Full:
+                pass
+        return False
+
+    def _fetch_day(self, day: str, q):
+        if self._stop.is_set(): return self._put(q, ("skipped", day, None))
+        try:
+            for batch in self.stream(day):
+                if not self._put(q, ("batch", day, batch)): return
+            self._put(q, ("done", day, None))
+        except Exception as e:
+            self._put(q, ("failed", day, e))
+
+    def run(self) -> BackfillReport:
+        import queue
+        from concurrent.futures import ThreadPoolExecutor
+        rep = BackfillReport(days_total=len(self.days)); t0 = time.perf_counter()
+        done = set() if self.force else db_archive_days_final(self.days, self.settle_hours)
+        pending = [d for d in self.days if d not in done]; rep.days_skipped = len(self.days) - len(pending)
+        q = queue.Queue(maxsize=self.workers * 2); counts: Dict[str, int] = {}
+        ex = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="backfill")
+        try:
+            for day in pending: ex.submit(self._fetch_day, day, q)
+            remaining = len(pending)
+            while remaining and not self._stop.is_set():
+                try: kind, day, payload = q.get(timeout=0.5)
+                except queue.Empty: continue
+                if kind == "batch":
+                    st = db_upsert_earthquakes(payload)
+                    counts[day] = counts.get(day, 0) + len(payload); rep.records += len(payload); rep.inserted += st.inserted
+                    continue
+                remaining -= 1
+                if kind == "done":
+                    db_mark_archive_day(day, "done", counts.pop(day, 0)); rep.days_done += 1
+                elif kind == "failed":
+                    db_mark_archive_day(day, "failed", counts.pop(day, None), str(payload)[:500])
+                    rep.days_failed += 1; logger.info(f"Backfill {day} error: {payload}")
+                rep.seconds = time.perf_counter() - t0
+                if self.on_progress and kind != "skipped": self.on_progress(day, rep)
+        finally:
+            # Kesintide işçiler kuyruk yerine durma bayrağını görür; yarım kalan günler işaretlenmez
+            self._stop.set(); ex.shutdown(wait=True, cancel_futures=True)
+        rep.seconds = time.perf_counter() - t0
+        logger.info(f"Backfill: {rep.days_done} gün, {rep.days_failed} hata, {rep.days_skipped} atlandı, {rep.records} kayıt, {rep.records_per_sec:.0f} kayıt/sn")
+        return rep
+
+def run_backfill_cli(start: str, end: str, workers: int, force: bool = False) -> int:
+    db_init()
+    def progress(day: str, rep: BackfillReport):
+        n = rep.days_done + rep.days_failed; total = rep.days_total - rep.days_skipped
+        print(f"[{n}/{total}] {day} | {rep.records} kayıt ({rep.inserted} yeni) | {rep.records_per_sec:.0f} kayıt/sn | {rep.days_failed} hata", flush=True)
+    job = ArchiveBackfill(start, end, workers, force, on_progress=progress,
+                          settle_hours=float(load_settings().get("archive_settle_hours", 48)))
+    try:
+        rep = job.run()
+    except KeyboardInterrupt:
+        job.stop(); print("Durduruldu; tamamlanan günler kaydedildi."); return 130
+    print(f"Bitti: {rep.days_done} gün, {rep.days_skipped} atlandı, {rep.days_failed} hata, {rep.records} kayıt, {rep.seconds:.1f} sn")
+    return 1 if rep.days_failed else 0
+
+# ------------------------
+# Yoklama zamanlayıcısı
+# ------------------------
+class PollScheduler:
+    """Canlı yoklama aralığını son sismik etkinliğe göre ayarlar.
+
+    Pencere içinde eşik büyüklüğünü aşan ya da saatlik eşik sayısını geçen deprem varsa aralık
+    min_seconds'a iner; sakin yoklamalarda decay katıyla taban aralığa geri büyür. Ardışık API
+    hatalarında o anki aralıktan başlayarak iki katına çıkar (error_max_seconds ile sınırlı); böylece
+    etkin dönemdeki tek bir hata yoklamayı taban aralığın ötesine atmaz.
+    Gecikmeye ±jitter oranında rastgele pay eklenir.
+    """
+    def __init__(self, base_seconds: float = 300, min_seconds: float = 30, hot_mag: float = 4.5, hot_rate: float = 10,
+                 window_seconds: float = 3600, decay: float = 1.5, error_max_seconds: float = 1800, jitter: float = 0.1):
+        self.base = max(1.0, float(base_seconds)); self.min = min(self.base, max(1.0, float(min_seconds)))
+        self.hot_mag = hot_mag; self.hot_rate = hot_rate; self.window = window_seconds
+        self.decay = max(1.0, decay); self.error_max = max(self.base, error_max_seconds); self.jitter = jitter
+        self.interval = self.base; self.errors = 0; self.reason = "taban"
+        self.delay = self.base; self.next_at: Optional[float] = None
+
+    @classmethod
+    def from_settings(cls, s: Dict[str, Any]) -> "PollScheduler":
+        d = DEFAULT_SETTINGS
+        f = lambda k: float(s.get(k, d[k]))
+        return cls(max(1.0, f("auto_refresh_minutes")) * 60, f("poll_min_seconds"), f("poll_hot_mag"), f("poll_hot_rate"),
+                   f("poll_window_minutes") * 60, f("poll_decay"), f("poll_error_max_minutes") * 60, f("poll_jitter"))
+
+    def activity(self, event_ts, mags, now: Optional[float] = None) -> Tuple[int, float]:
+        """Penceredeki (adet, en büyük M); girdiler yeniden eskiye sıralı olmalıdır (EventStore sırası)."""
+        since = (now or time.time()) - self.window; n = 0; top = 0.0
+        for ts, m in zip(event_ts, mags):
+            if ts < since: break
+            n += 1
+            if m == m and m > top: top = m
+        return n, top
+
+    def success(self, event_ts, mags, now: Optional[float] = None) -> float:
+        """Başarılı yoklamadan sonra çağrılır; bir sonraki yoklamaya kadar beklenecek saniyeyi döndürür."""
+        now = now or time.time(); self.errors = 0
+        n, top = self.activity(event_ts, mags, now)
+        rate = n * 3600.0 / self.window if self.window else 0.0
+        if top >= self.hot_mag or rate >= self.hot_rate:
+            self.interval = self.min; self.reason = f"etkin (M{top:.1f}, {rate:.0f}/saat)"
+        else:
+            self.interval = min(self.base, self.interval * self.decay)
+            self.reason = "taban" if self.interval >= self.base else "sönümleniyor"
+        return self._schedule(self.interval, now)
+
+    def failure(self, now: Optional[float] = None) -> float:
+        """Başarısız yoklamadan sonra çağrılır; etkin aralık korunur, bekleme üstel olarak uzar."""
+        now = now or time.time(); self.errors += 1
+        self.reason = f"hata geri çekilmesi ({self.errors})"
+        return self._schedule(min(self.error_max, self.interval * 2 ** self.errors), now)
+
+    def _schedule(self, seconds: float, now: float) -> float:
+        import random
+        self.delay = max(1.0, seconds * (1 + random.uniform(-self.jitter, self.jitter)))
+        self.next_at = now + self.delay
+        return self.delay
+
+    def describe(self) -> str:
+        nxt = time.strftime("%H:%M:%S", time.localtime(self.next_at)) if self.next_at else "—"
+        return f"Yoklama: {self.delay:.0f} sn ({self.reason}) | sonraki {nxt}"
+
+# ------------------------
+# Arka plan servisi
+# ------------------------
+DAEMON_HEARTBEAT = 10  # sn; durum dosyası en az bu sıklıkla yazılır
+CONSUMER_POLL_MS = 2000  # daemon çalışırken arayüzün data_version yoklama aralığı
+
+def write_status_file(path: str, status: Dict[str, Any]):
+    # Okuyucu yarım dosya görmesin: geçici dosyaya yazıp yerine taşı
+    fd, tmp = tempfile.mkstemp(prefix=".status", dir=os.path.dirname(path) or ".")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(status, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+def read_daemon_status(path: str = DAEMON_STATUS_FILE, max_age: float = 3 * DAEMON_HEARTBEAT) -> Optional[Dict[str, Any]]:
+    """Çalışan bir daemon'un durumu; dosya yoksa, bayatsa ya da süreç kapanmışsa None."""
+    try:
+        with open(path, "r", encoding="utf-8") as f: st = json.load(f)
+        if st.get("state") != "running" or time.time() - float(st.get("updated_at", 0)) > max_age: return None
+        return st if pid_alive(int(st["pid"])) else None
+    except (OSError, ValueError, KeyError):
+        return None
+
+class IngestDaemon:
+    """Arayüzsüz veri toplayıcı: canlı yoklama (PollScheduler) ve son günlerin arşiv doldurması.
+
+    Canlı yoklama ana iş parçacığında, doldurma ayrı bir iş parçacığında çalışır; ikisi de deprem.db'ye
+    (WAL) yazar. Sağlık ve ilerleme status_path'teki JSON dosyasına yazılır; kalp atışı kendi iş parçacığındadır,
+    böylece API kesintisinde dakikalarca süren bir yoklama daemon'u arayüze ölü göstermez.
+    """
+    def __init__(self, settings: Optional[Dict[str, Any]] = None, backfill_days: int = 7, backfill_hours: float = 6,
+                 workers: int = 2, status_path: str = DAEMON_STATUS_FILE):
+        self.settings = settings or load_settings(); self.status_path = status_path
+        self.backfill_days = backfill_days; self.backfill_every = backfill_hours * 3600; self.workers = workers
+        self.scheduler = PollScheduler.from_settings(self.settings)
+        self._stop = threading.Event(); self._lock = threading.Lock(); self._write_lock = threading.Lock()
+        self._job: Optional[ArchiveBackfill] = None; self._thread: Optional[threading.Thread] = None
+        self.status: Dict[str, Any] = {
+            "pid": os.getpid(), "started_at": time.time(), "updated_at": time.time(), "state": "running", "health": "ok",
+            "live": {"last_ok_at": None, "last_error": None, "errors": 0, "inserted": 0, "updated": 0,
+                     "interval": None, "next_at": None, "reason": None},
+            "backfill": {"running": False, "range": None, "last_run_at": None, "next_at": None,
+                         "days_done": 0, "days_failed": 0, "days_skipped": 0, "records": 0, "error": None},
+        }
+
+    def _recent_activity(self) -> Tuple[Tuple, Tuple]:
+        rows = db_connect().execute("SELECT event_ts, COALESCE(mag, 0) FROM earthquakes WHERE event_ts >= ? ORDER BY event_ts DESC",
+                                    (int(time.time() - self.scheduler.window),)).fetchall()
+        return tuple(zip(*rows)) if rows else ((), ())
+
+    def poll_live(self) -> float:
+        """Bir canlı yoklama yapar; bir sonrakine kadar beklenecek saniyeyi döndürür."""
+        sc = self.scheduler; live = self.status["live"]
+        try:
+            st = db_upsert_earthquakes(fetch_live_earthquakes())
+            delay = sc.success(*self._recent_activity())
+            with self._lock:
+                live.update(last_ok_at=time.time(), last_error=None, errors=0, inserted=st.inserted, updated=st.updated)
+        except Exception as ex:
+            delay = sc.failure(); logger.info(f"Daemon canlı yoklama hatası: {ex}")
+            with self._lock: live.update(last_error=str(ex)[:500], errors=sc.errors)
+        with self._lock: live.update(interval=round(sc.delay, 1), next_at=sc.next_at, reason=sc.reason)
+        logger.info(sc.describe())
+        return delay
+
+    def _backfill_range(self) -> Tuple[str, str]:
+        end = time.time() + TR_UTC_OFFSET
+        return (time.strftime("%Y-%m-%d", time.gmtime(end - (self.backfill_days - 1) * 86400)), time.strftime("%Y-%m-%d", time.gmtime(end)))
+
+    def run_backfill(self):
+        start, end = self._backfill_range(); bf = self.status["backfill"]
+        def progress(day: str, rep: BackfillReport):
+            with self._lock: bf.update(days_done=rep.days_done, days_failed=rep.days_failed, records=rep.records)
+        with self._lock: bf.update(running=True, range=[start, end], error=None, days_done=0, days_failed=0, days_skipped=0, records=0)
+        self._job = ArchiveBackfill(start, end, self.workers, on_progress=progress,
+                                    settle_hours=float(self.settings.get("archive_settle_hours", 48)))
+        try:
+            rep = self._job.run()
+            with self._lock: bf.update(days_done=rep.days_done, days_failed=rep.days_failed, days_skipped=rep.days_skipped, records=rep.records)
+        except Exception as ex:
+            logger.info(f"Daemon doldurma hatası: {ex}")
+            with self._lock: bf["error"] = str(ex)[:500]
+        finally:
+            with self._lock: bf.update(running=False, last_run_at=time.time(), next_at=time.time() + self.backfill_every)
+
+    def write_status(self):
+        with self._lock:
+            st = self.status; st["updated_at"] = time.time()
+            bf = st["backfill"]
+            st["health"] = "degraded" if st["live"]["errors"] or bf["days_failed"] or bf["error"] else "ok"
+            snapshot = json.loads(json.dumps(st))
+        try:
+            with self._write_lock: write_status_file(self.status_path, snapshot)
+        except OSError as ex: logger.info(f"Durum dosyası yazılamadı: {ex}")
+
+    def _heartbeat(self):
+        while not self._stop.wait(DAEMON_HEARTBEAT):
+            self.write_status()
+
+    def run(self, once: bool = False):
+        db_init(); next_live = 0.0
+        logger.info(f"Daemon başladı (pid {os.getpid()}); durum: {self.status_path}")
+        beat = threading.Thread(target=self._heartbeat, name="heartbeat", daemon=True); beat.start()
+        try:
+            while not self._stop.is_set():
+                now = time.time()
+                if now >= next_live:
+                    next_live = now + self.poll_live()
+                due = self.status["backfill"]["next_at"] or 0
+                if self.backfill_days > 0 and now >= due and not (self._thread and self._thread.is_alive()):
+                    if once:
+                        self.run_backfill()
+                    else:
+                        self._thread = threading.Thread(target=self.run_backfill, name="backfill", daemon=True); self._thread.start()
+                self.write_status()
+                if once: break
+                self._stop.wait(max(0.1, min(DAEMON_HEARTBEAT, next_live - time.time())))
+        finally:
+            self._stop.set(); beat.join()
+            if self._job: self._job.stop()
+            if self._thread: self._thread.join()
+            self.status["state"] = "stopped"; self.write_status()
+            logger.info("Daemon durdu")
+
+    def stop(self):
+        self._stop.set()
+        if self._job: self._job.stop()
+
+def run_daemon_cli(backfill_days: int, backfill_hours: float, workers: int, once: bool = False) -> int:
+    if read_daemon_status():
+        print("Başka bir daemon zaten çalışıyor."); return 1
+    d = IngestDaemon(backfill_days=backfill_days, backfill_hours=backfill_hours, workers=workers)
+    signal.signal(signal.SIGTERM, lambda *_: d.stop())
+    try:
+        d.run(once)
+    except KeyboardInterrupt:
+        d.stop()
+    return 0
+
+# ------------------------
+# Yenileme hattı
+# ------------------------
+@dataclass
+class RefreshDiff:
+    """Bir canlı yenilemenin sonucu; rows EventStore.COLUMNS sırasındaki yeni/değişmiş satırlardır."""
+    ok: bool = True
+    error: Optional[str] = None
+    fetched: int = 0
+    inserted_ids: List[str] = field(default_factory=list)
+    updated_ids: List[str] = field(default_factory=list)
+    unchanged: int = 0
+    rows: List[Tuple] = field(default_factory=list)
+    top: Optional[Earthquake] = None
+    seconds: Dict[str, float] = field(default_factory=dict)
+
+class RefreshPipeline(QObject):
+    """Canlı yenileme hattı: fetch → normalize → persist → diff, arka plan iş parçacığında.
+
+    Aynı anda tek tur çalışır; tur sürerken gelen istekler tek bir ek turda birleştirilir.
+    cancel() süren turun sonucunu düşürür; persist aşaması bölünmez (işlem ya tamamen yazılır ya hiç).
+    Arayüz yalnızca diffReady ile gelen RefreshDiff'i görür.
+    """
+    diffReady = Signal(object)
+
+    def __init__(self, parent=None, fetch=None):
+        from concurrent.futures import ThreadPoolExecutor
+        super().__init__(parent)
+        self._fetch = fetch or fetch_live_earthquakes
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="refresh")
+        self._lock = threading.Lock(); self._running = False; self._again = False
+        self._token = threading.Event()
+
+    @property
+    def busy(self) -> bool:
+        return self._running
+
+    def request(self) -> bool:
+        """Yeni tur başlatır; tur zaten sürüyorsa ek tur işaretlenir ve False döner."""
+        with self._lock:
+            if self._running:
+                self._again = True; return False
+            self._running = True; self._token = token = threading.Event()
+        self._pool.submit(self._run, token)
+        return True
+
+    def cancel(self):
+        with self._lock:
+            self._again = False; self._token.set()
+
+    def shutdown(self):
+        self.cancel(); self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _stage_fetch(self, _, diff: RefreshDiff):
+        items = self._fetch(); diff.fetched = len(items); return items
+
+    @staticmethod
+    def _stage_normalize(items, diff: RefreshDiff):
+        latest, skipped = normalize_earthquakes(items)
+        if latest:
+            row = max((r for r, _ in latest.values()), key=lambda r: (r[15] or 0, r[0]))
+            diff.top = Earthquake(*row[:14], row[15])
+        return latest, skipped
+
+    @staticmethod
+    def _stage_persist(normalized, diff: RefreshDiff):
+        st = db_upsert_normalized(*normalized)
+        diff.inserted_ids = st.inserted_ids; diff.updated_ids = st.updated_ids; diff.unchanged = st.unchanged
+        return st
+
+    @staticmethod
+    def _stage_diff(_, diff: RefreshDiff):
+        diff.rows = db_fetch_rows(diff.inserted_ids + diff.updated_ids, EventStore.COLUMNS)
+        return diff
+
+    def _run(self, token: threading.Event):
+        diff = RefreshDiff(); data = None
+        try:
+            for name, stage in (("fetch", self._stage_fetch), ("normalize", self._stage_normalize),
+                                ("persist", self._stage_persist), ("diff", self._stage_diff)):
+                if token.is_set(): break
+                t = time.perf_counter(); data = stage(data, diff); diff.seconds[name] = time.perf_counter() - t
+        except ApiError as ex:
+            # Son veriler DB'den gösterilmeye devam eder
+            diff.ok = False; diff.error = f"API hatası: {ex}"
+        except Exception as ex:
+            diff.ok = False; diff.error = f"Hata: {ex}"; logger.info(f"refresh error: {ex}")
+        with self._lock:
+            again = self._again and not token.is_set(); self._again = False
+            if again: self._token = nxt = threading.Event()
+            else: self._running = False
+        if not token.is_set():
+            self.diffReady.emit(diff)
+        if again:
+            self._pool.submit(self._run, nxt)
+
+# ------------------------
+# Harita veri kaynakları
+# ------------------------
+class MapSource(ABC):
+    """Harita işçisinin veri kaynağı; load() işçi iş parçacığında çağrılır. network=True olanlar API'ye gider.
+
+    time_range: kaynağın kapsadığı event_ts aralığı [start, end); None tüm katalog demektir (sunucu kümeleri bununla süzer).
+    """
+    network = False
+    time_range: Optional[Tuple[int, int]] = None
+
+    @abstractmethod
+    def load(self, min_mag: float) -> List[Earthquake]:
+        """min_mag ve üstündeki kayıtlar."""
+
+class SnapshotSource(MapSource):
+    """Bellekteki anlık görüntü (ör. EventStore.records()); filtre değişikliği yalnızca süzme demektir."""
+    def __init__(self, records: List[Earthquake]):
+        self.records = records
+
+    def load(self, min_mag: float) -> List[Earthquake]:
+        return [r for r in self.records if (r.mag or 0) >= min_mag]
+
+    def __str__(self): return f"anlık görüntü ({len(self.records)} kayıt)"
+
+class DbRangeSource(MapSource):
+    """event_ts aralığı [start, end) ve büyüklük için indeksli DB sorgusu."""
+    def __init__(self, time_range: Tuple[int, int], limit: int = 1_000_000):
+        self.time_range = time_range; self.limit = limit
+
+    def load(self, min_mag: float) -> List[Earthquake]:
+        start, end = self.time_range
+        return CatalogPager(self.limit, shape="records", min_mag=min_mag or None, time_range=(start, end - 1)).first()
+
+    def __str__(self): return f"DB {self.time_range[0]}..{self.time_range[1]}"
+
+class NetworkSource(MapSource):
+    """Açık ağ yenilemesi: canlı akış ya da arşiv günü çekilir, DB'ye yazılır, sonra süzülür."""
+    network = True
+
+    def __init__(self, day: Optional[str] = None, settle_hours: float = DEFAULT_SETTINGS["archive_settle_hours"]):
+        self.day = day; self.settle_hours = settle_hours
+        self.time_range = archive_day_bounds(day) if day else None
+
+    def load(self, min_mag: float) -> List[Earthquake]:
+        if self.day is None:
+            eqs = fetch_live_earthquakes(); db_upsert_earthquakes(eqs)
+            now = int(time.time()); recs = [Earthquake.from_api(e, now) for e in eqs]
+        else:
+            recs, cached = fetch_archive_cached(self.day, self.settle_hours)
+            if cached: logger.info(f"Arşiv {self.day}: yerel veriden ({len(recs)} kayıt)")
+        return [r for r in recs if (r.mag or 0) >= min_mag]
+
+    def __str__(self): return f"ağ ({self.day or 'canlı'})"
+
+def db_archive_day_status(day: str) -> Optional[str]:
+    r = db_connect().execute("SELECT status FROM archive_days WHERE day = ?", (day,)).fetchone()
+    return r[0] if r else None
+
+def map_source(day: Optional[str], store: Optional[EventStore] = None, refresh: bool = False,
+               settle_hours: float = DEFAULT_SETTINGS["archive_settle_hours"]) -> MapSource:
+    """Harita için kaynak seçimi. day=None canlı moddur; refresh=True yalnızca açık yenilemede verilir.
+
+    Canlı mod EventStore anlık görüntüsünden, daha önce çekilmiş arşiv günleri DB'den okunur; API'ye
+    yalnızca açık yenilemede ya da hiç çekilmemiş bir arşiv gününde gidilir.
+    """
+    if refresh:
+        return NetworkSource(day, settle_hours)
+    if day is None:
+        return SnapshotSource((store or EVENT_STORE).records())
+    if db_archive_day_status(day) == "done":
+        return DbRangeSource(archive_day_bounds(day))
+    return NetworkSource(day, settle_hours)
+
+# ------------------------
+# Harita çizimi
+# ------------------------
+def eq_geojson(recs: List[Earthquake]) -> Dict[str, Any]:
+    """Tek FeatureCollection; özellikler yalnızca çizim ve açılır pencere için: m, d, t (başlık), dt (tarih)."""
+    return {"type": "FeatureCollection", "features": [
+        {"type": "Feature", "id": e.earthquake_id, "geometry": {"type": "Point", "coordinates": [e.lon, e.lat]},
+         "properties": {"m": e.mag, "d": e.depth, "t": e.title, "dt": e.date}}
+        for e in recs if e.lat is not None and e.lon is not None]}
+
+# mag_to_color ve eq_popup_html'in JS karşılıkları ile vurgulama; QuakeGeoJson ve QuakeClusters ortak kullanır.
+_QUAKE_JS_COMMON = """
+    var colors = [[7, "darkred"], [6, "red"], [5, "orange"], [4, "yellow"], [3, "lightgreen"]];
+    function color(m) { for (var i = 0; i < colors.length; i++) if (m >= colors[i][0]) return colors[i][1]; return "blue"; }
+    function esc(s) { return String(s == null ? "" : s).replace(/[&<>"]/g, function(c) { return {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"}[c]; }); }
+    function html(p) {
+        return "<b>Büyüklük:</b> M" + (+p.m).toFixed(1) + "<br><b>Konum:</b> " + esc(p.t) +
+               "<br><b>Tarih:</b> " + esc(p.dt) + "<br><b>Derinlik:</b> " + (+p.d).toFixed(1) + " km";
+    }
+    function marker(f, ll, renderer) {
+        var m = f.properties.m || 0;
+        return L.circleMarker(ll, {renderer: renderer, radius: Math.max(4, m * 1.5), color: color(m), fill: true, fillOpacity: 0.7});
+    }
+    var hl = null;
+    function highlight(l) {
+        if (hl && hl.l !== l) hl.l.setStyle({color: hl.color, weight: hl.weight});
+        if (!hl || hl.l !== l) hl = {l: l, color: l.options.color, weight: l.options.weight};
+        l.setStyle({color: "#00e5ff", weight: 5}); l.bringToFront(); l.openPopup();
+    }
+"""
+
+# İşaretler tek canvas üzerinde çizilir.
+# window.quakeMap.update({add: [feature], remove: [id]}) katmanı yerinde günceller (aynı id'li özellik değiştirilir).
+# window.quakeMap.focus(id, zoom[, konum]) olaya uçar, işaretini vurgular ve açılır penceresini açar; olay katmanda yoksa false döner.
+_QUAKE_LAYER_JS = """
+{% macro script(this, kwargs) %}
+(function() {""" + _QUAKE_JS_COMMON + """
+    var renderer = L.canvas({padding: 0.5});
+    var target = {{ this.target }}, clustered = typeof target.refreshClusters === "function";
+    var map = {{ this.map }}, byId = {}, fresh = [];
+    var {{ this.get_name() }} = L.geoJSON(null, {
+        pointToLayer: function(f, ll) { return marker(f, ll, renderer); },
+        onEachFeature: function(f, l) { byId[f.id] = l; fresh.push(l); }
+    });
+    var layer = {{ this.get_name() }};
+    function popup(l) { return html(l.feature.properties); }
+    layer.bindPopup(popup, {maxWidth: 300}).bindTooltip(popup);
+    function remove(id) {
+        var l = byId[id]; if (!l) return;
+        delete byId[id]; layer.removeLayer(l); if (clustered) target.removeLayer(l);
+        if (hl && hl.l === l) hl = null;
+    }
+    function add(features) {
+        if (!features || !features.length) return;
+        fresh = []; layer.addData(features);
+        if (clustered) target.addLayers(fresh);
+    }
+    if (!clustered) target.addLayer(layer);
+    add(({{ this.data }} || {}).features);
+    window.quakeMap = {
+        layer: layer, byId: byId,
+        update: function(d) {
+            (d.remove || []).forEach(remove);
+            (d.add || []).forEach(function(f) { remove(f.id); });
+            add(d.add);
+            return Object.keys(byId).length;
+        },
+        focus: function(id, zoom) {
+            var l = byId[id]; if (!l) return false;
+            if (clustered) { target.zoomToShowLayer(l, function() { highlight(l); }); return true; }
+            map.once("moveend", function() { highlight(l); });
+            map.flyTo(l.getLatLng(), Math.max(map.getZoom(), zoom || 9), {duration: 0.6});
+            return true;
+        }
+    };
+})();
+{% endmacro %}
+"""
+
+if HAS_FOLIUM:
+    class QuakeGeoJson(MacroElement):
+        """Depremleri tek GeoJSON katmanı olarak gömer; renk, yarıçap ve açılır pencere tarayıcıda üretilir.
+
+        target verilirse (ör. MarkerCluster) katman ona, yoksa haritaya eklenir. Veri sayfaya render_map()
+        tarafından yerleştirilir: folium çıktı betiğini yeniden Jinja şablonu olarak derlediği için büyük
+        veriyi şablondan geçirmek sayfa üretimini saniyelerce uzatır.
+        """
+        _template = Template(_QUAKE_LAYER_JS)
+
+        def __init__(self, recs: List[Earthquake], target=None):
+            super().__init__()
+            self._name = "QuakeGeoJson"; self._target = target
+            # "</" kaçırılır: başlıktaki bir </script> sayfayı bölmesin
+            self.payload = json.dumps(eq_geojson(recs), ensure_ascii=False, separators=(",", ":")).replace("</", "<\\/")
+
+        @property
+        def data(self) -> str:
+            return f"/*{self.get_name()}*/null"
+
+        @property
+        def target(self) -> str:
+            return (self._target or self._parent).get_name()
+
+        @property
+        def map(self) -> str:
+            return self._parent.get_name()
+
+def render_map(m) -> str:
+    """Haritanın HTML'i: aynadaki varlıklar yerel adreslere çevrilir, QuakeGeoJson yer tutucuları gerçek veriyle değiştirilir."""
+    html = localize_assets(m.get_root().render()); stack = [m]
+    while stack:
+        el = stack.pop(); stack.extend(el._children.values())
+        if isinstance(el, QuakeGeoJson): html = html.replace(el.data, el.payload, 1)
+    return html
+
+@dataclass
+class MapResult:
+    """MapGeneratorWorker çıktısı: yeni sayfa (MAP_PAGES anahtarı) ya da yüklü sayfaya uygulanacak fark (update_js).
+
+    shown, sayfadaki olayların id -> imza eşlemesidir; bir sonraki fark buna göre hesaplanır.
+    """
+    page_key: Tuple
+    shown: Dict[str, Tuple]
+    page: Optional[str] = None
+    update_js: Optional[str] = None
+    added: int = 0
+    removed: int = 0
+
+def build_map(recs: List[Earthquake], cluster_mode: str = "Yok", tiles_url: str = "OpenStreetMap", geojson: bool = True,
+              tile_cache: bool = False):
+    """folium haritası; geojson=False eski yol (olay başına CircleMarker + Popup), tile_cache=True karoları yerel vekilden çeker."""
+    attr = None
+    tiles_to_use = tiles_url
+    layer = next((k for k, (label, _, _) in TILE_SOURCES.items() if label == tiles_url), None)
+    if tile_cache and layer:
+        tiles_to_use = tile_proxy().url_template(layer); attr = TILE_SOURCES[layer][2]
+    elif tiles_to_use == "Esri Dünya Uydu":
+        tiles_to_use = "https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}"
+        attr = "Tiles © Esri"
+
+    if recs:
+        m = folium.Map(location=[recs[0].lat, recs[0].lon], zoom_start=6, tiles=tiles_to_use, attr=attr)
+    else:
+        m = folium.Map(location=[39.0,35.0], zoom_start=6, tiles=tiles_to_use, attr=attr)
+
+    if cluster_mode == SERVER_CLUSTERS:
+        m.add_child(QuakeClusters())
+    elif cluster_mode == "HeatMap":
+        heat = [[e.lat, e.lon, e.mag] for e in recs]
+        if heat: HeatMap(heat, radius=18).add_to(m)
+    elif geojson:
+        target = None
+        if cluster_mode == "MarkerCluster":
+            target = MarkerCluster(chunkedLoading=True); m.add_child(target)
+        m.add_child(QuakeGeoJson(recs, target))
+    elif cluster_mode == "MarkerCluster":
+        mc = MarkerCluster(); m.add_child(mc)
+        MapGeneratorWorker._add_markers(mc, recs)
+    else:
+        MapGeneratorWorker._add_markers(m, recs)
+
+    folium.LayerControl().add_to(m)
+    return m
+
+# ------------------------
+# Harita sayfa önbelleği
+# ------------------------
+MAP_SCHEME = b"deprem"
+MAP_CACHE_ROOT = os.path.join(tempfile.gettempdir(), "deprem-map-cache")
+
+class PageCache:
+    """Bayt sınırlı LRU sayfa/varlık önbelleği; deprem://map/<anahtar> istekleri buradan yanıtlanır.
+
+    Anahtar verilmezse içerik özeti kullanılır (aynı sayfa bir kez tutulur). Sınır aşılınca en eski
+    girdiler spill_dir verilmişse diske taşınır, yoksa düşer; diskteki girdi okununca belleğe geri alınır.
+    close() belleği boşaltır ve dizini siler.
+    """
+    def __init__(self, max_bytes: int = 64 << 20, spill_dir: Optional[str] = None):
+        self.max_bytes = max_bytes; self.spill_dir = spill_dir
+        self._mem: "OrderedDict[str, Tuple[bytes, str]]" = OrderedDict(); self._size = 0
+        self._spilled: Dict[str, str] = {}; self._lock = threading.Lock()
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.spill_dir, hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest())
+
+    def put(self, data: bytes, mime: str = "text/html", key: Optional[str] = None) -> str:
+        key = key or hashlib.blake2b(data, digest_size=16).hexdigest()
+        with self._lock:
+            old = self._mem.pop(key, None)
+            if old: self._size -= len(old[0])
+            self._mem[key] = (data, mime); self._size += len(data)
+            self._evict()
+        return key
+
+    def get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is not None:
+                self._mem.move_to_end(key); return hit
+            mime = self._spilled.pop(key, None)
+            if mime is None: return None
+            try:
+                with open(self._file(key), "rb") as f: data = f.read()
+                os.remove(self._file(key))
+            except OSError:
+                return None
+            self._mem[key] = (data, mime); self._size += len(data)
+            self._evict()
+            return data, mime
+
+    def discard(self, key: str):
+        with self._lock:
+            old = self._mem.pop(key, None)
+            if old: self._size -= len(old[0])
+            if self._spilled.pop(key, None) is not None:
+                try: os.remove(self._file(key))
+                except OSError: pass
+
+    def _evict(self):
+        # Son eklenen girdi sınırdan büyük olsa da tutulur: sayfa hemen ardından istenecek
+        while self._size > self.max_bytes and len(self._mem) > 1:
+            key, (data, mime) = self._mem.popitem(last=False); self._size -= len(data)
+            if self.spill_dir:
+                try:
+                    if not os.path.isdir(self.spill_dir): _make_spill_dir(self.spill_dir)
+                    with open(self._file(key), "wb") as f: f.write(data)
+                    self._spilled[key] = mime
+                except OSError as ex:
+                    logger.info(f"Harita önbelleği diske yazılamadı: {ex}")
+
+    def close(self):
+        with self._lock:
+            self._mem.clear(); self._size = 0; self._spilled.clear()
+            if self.spill_dir: shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+def _make_spill_dir(path: str):
+    # Çöken eski süreçlerden kalan dizinler de temizlenir (ad = pid)
+    root = os.path.dirname(path); os.makedirs(path, exist_ok=True)
+    for name in os.listdir(root):
+        if name.isdigit() and int(name) != os.getpid() and not pid_alive(int(name)):
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+MAP_PAGES = PageCache(int(DEFAULT_SETTINGS["map_cache_mb"]) << 20, os.path.join(MAP_CACHE_ROOT, str(os.getpid())))
+atexit.register(MAP_PAGES.close)
+
+def map_page_url(key: str) -> QUrl:
+    return QUrl(f"{MAP_SCHEME.decode()}://map/{key}")
+
+def register_map_scheme():
+    """deprem:// şemasını tanıtır; QApplication oluşturulmadan önce çağrılmalıdır."""
+    if not HAS_WEBENGINE: return
+    sc = QWebEngineUrlScheme(MAP_SCHEME); sc.setSyntax(QWebEngineUrlScheme.Syntax.Host)
+    sc.setFlags(QWebEngineUrlScheme.Flag.SecureScheme | QWebEngineUrlScheme.Flag.CorsEnabled)
+    QWebEngineUrlScheme.registerScheme(sc)
+
+if HAS_WEBENGINE:
+    class MapSchemeHandler(QWebEngineUrlSchemeHandler):
+        """deprem://map/<anahtar> isteklerini MAP_PAGES'ten, deprem://map/assets/... isteklerini ASSETS_DIR'den,
+        deprem://map/clusters?... isteklerini sunucu kümeleri dizininden yanıtlar."""
+        def requestStarted(self, job: QWebEngineUrlRequestJob):
+            url = job.requestUrl(); path = url.path().lstrip("/")
+            if path == "clusters": hit = cluster_response(url.query())
+            elif path.startswith("assets/"): hit = read_asset(path[len("assets/"):])
+            else: hit = MAP_PAGES.get(path)
+            if hit is None:
+                job.fail(QWebEngineUrlRequestJob.Error.UrlNotFound); return
+            buf = QBuffer(job); buf.setData(hit[0]); buf.open(QIODevice.OpenModeFlag.ReadOnly)
+            job.reply(hit[1].encode("ascii"), buf)
+
+    def install_map_scheme(view: QWebEngineView):
+        profile = view.page().profile()
+        if profile.urlSchemeHandler(MAP_SCHEME) is None:
+            profile.installUrlSchemeHandler(MAP_SCHEME, MapSchemeHandler(profile))
+
+# ------------------------
+# Çevrimdışı harita varlıkları
+# ------------------------
+_ASSET_REF = re.compile(r'(<(?:script|link)\b[^>]*?\b(?:src|href)=")(https?://[^"]+)(")')
+_CSS_URL = re.compile(r"url\(\s*['\"]?([^'\")]+)['\"]?\s*\)")
+
+def asset_path(url: str) -> str:
+    """CDN adresinin ASSETS_DIR altındaki yeri: <ana makine>/<yol>; göreli CSS başvuruları böylece çözülür."""
+    from urllib.parse import urlsplit
+    u = urlsplit(url)
+    return os.path.normpath(os.path.join(ASSETS_DIR, u.netloc, u.path.lstrip("/")))
+
+def localize_assets(html: str) -> str:
+    """Aynada bulunan script/link adreslerini deprem://map/assets/... ile değiştirir; bulunmayanlara dokunmaz."""
+    def sub(mo):
+        url = mo.group(2)
+        if not os.path.isfile(asset_path(url)): return mo.group(0)
+        rel = os.path.relpath(asset_path(url), ASSETS_DIR).replace(os.sep, "/")
+        return f"{mo.group(1)}{MAP_SCHEME.decode()}://map/assets/{rel}{mo.group(3)}"
+    return _ASSET_REF.sub(sub, html)
+
+def read_asset(rel: str) -> Optional[Tuple[bytes, str]]:
+    import mimetypes
+    path = os.path.normpath(os.path.join(ASSETS_DIR, rel))
+    if not path.startswith(ASSETS_DIR + os.sep) or not os.path.isfile(path): return None
+    with open(path, "rb") as f: data = f.read()
+    return data, mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+def folium_asset_urls() -> List[str]:
+    """Uygulamanın ürettiği sayfaların (tüm küme modları) çektiği JS/CSS adresleri."""
+    recs = [Earthquake.from_api(e, 0) for e in synthetic_earthquakes(2)]
+    urls: List[str] = []
+    for mode in ("Yok", "MarkerCluster", "HeatMap"):
+        for mo in _ASSET_REF.finditer(render_map(build_map(recs, mode))):
+            if mo.group(2) not in urls: urls.append(mo.group(2))
+    return urls
+
+def vendor_assets(force: bool = False) -> Tuple[int, List[str]]:
+    """Sayfa varlıklarını ve CSS'lerin başvurduğu yazı tipi/görselleri ASSETS_DIR'e indirir. (indirilen, eksik)"""
+    from urllib.parse import urljoin
+    todo = folium_asset_urls(); seen = set(todo); fetched = 0; missing: List[str] = []
+    bundled = os.path.join(os.path.dirname(folium.__file__), "templates")
+    while todo:
+        url = todo.pop(0); path = asset_path(url)
+        if force or not os.path.isfile(path):
+            data = None
+            try:
+                r = API_CLIENT.session.get(url, timeout=API_CLIENT.timeout); r.raise_for_status(); data = r.content
+            except Exception as ex:
+                # folium'un paketle gelen kopyaları (ör. leaflet_heat.min.js) ağ olmadan da kullanılabilir
+                local = os.path.join(bundled, url.rsplit("/", 1)[-1])
+                if "python-visualization/folium" in url and os.path.isfile(local):
+                    with open(local, "rb") as f: data = f.read()
+                else:
+                    missing.append(url); logger.info(f"Varlık indirilemedi {url}: {ex}"); continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f: f.write(data)
+            fetched += 1
+        if path.endswith(".css"):
+            with open(path, "r", encoding="utf-8", errors="replace") as f: css = f.read()
+            for ref in _CSS_URL.findall(css):
+                if ref.startswith(("data:", "#")): continue
+                dep = urljoin(url, ref).split("#")[0].split("?")[0]
+                if dep not in seen: seen.add(dep); todo.append(dep)
+    return fetched, missing
+
+def run_assets_cli(check: bool = False, force: bool = False) -> int:
+    if not HAS_FOLIUM:
+        print("Folium kütüphanesi bulunamadı."); return 1
+    if not check:
+        fetched, missing = vendor_assets(force)
+        print(f"{fetched} varlık indirildi, {len(missing)} eksik -> {ASSETS_DIR}")
+        for url in missing: print(f"  eksik: {url}")
+    # Ağ olmadan doğrulama: yerelleştirilmiş sayfada uzak script/link kalmamalı
+    recs = [Earthquake.from_api(e, 0) for e in synthetic_earthquakes(2)]; remote = set()
+    for mode in ("Yok", "MarkerCluster", "HeatMap"):
+        remote.update(mo.group(2) for mo in _ASSET_REF.finditer(render_map(build_map(recs, mode))))
+    print(f"Çevrimdışı: {len(remote)} uzak varlık" + ("" if remote else " (tamam)"))
+    for url in sorted(remote): print(f"  uzak: {url}")
+    return 1 if remote else 0
+
+# ------------------------
+# Karo önbelleği
+# ------------------------
+# katman -> (arayüz adı, kaynak adresi, atıf)
+TILE_SOURCES = {
+    "osm": ("OpenStreetMap", "https://tile.openstreetmap.org/{z}/{x}/{y}.png",
+            '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors'),
+    "esri": ("Esri Dünya Uydu", "https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}", "Tiles © Esri"),
+}
+TURKEY_BBOX = (35.8, 25.6, 42.2, 44.9)  # en küçük enlem, boylam, en büyük enlem, boylam
+
+class TileCache:
+    """MBTiles düzeninde SQLite karo deposu (katman sütunlu, tile_row TMS) ve bayt sınırlı LRU.
+
+    Okunan karonun last_access'i en fazla dakikada bir güncellenir; sınır aşılınca en eski karolar
+    %90'a inene kadar silinir. hits/misses bu sürecin sayaçlarıdır; close() toplamları metadata'ya ekler.
+    """
+    def __init__(self, path: str = TILES_DB_PATH, max_bytes: int = 512 << 20):
+        self.path = path; self.max_bytes = max_bytes; self.hits = self.misses = self.evicted = 0
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(path, isolation_level=None, timeout=30, check_same_thread=False)
+        self._con.execute("PRAGMA journal_mode=WAL"); self._con.execute("PRAGMA synchronous=NORMAL")
+        self._con.execute("""CREATE TABLE IF NOT EXISTS tiles(layer TEXT, zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER,
+                             tile_data BLOB, size INTEGER, last_access INTEGER,
+                             PRIMARY KEY(layer, zoom_level, tile_column, tile_row)) WITHOUT ROWID""")
+        self._con.execute("CREATE INDEX IF NOT EXISTS idx_tiles_access ON tiles(last_access)")
+        self._con.execute("CREATE TABLE IF NOT EXISTS metadata(name TEXT PRIMARY KEY, value TEXT)")
+        self._con.execute("INSERT OR IGNORE INTO metadata VALUES ('format', 'png'), ('hits', '0'), ('misses', '0')")
+        self._size = self._con.execute("SELECT COALESCE(SUM(size), 0) FROM tiles").fetchone()[0]
+
+    @staticmethod
+    def _key(layer: str, z: int, x: int, y: int) -> Tuple[str, int, int, int]:
+        return layer, z, x, (1 << z) - 1 - y
+
+    def get(self, layer: str, z: int, x: int, y: int) -> Optional[bytes]:
+        k = self._key(layer, z, x, y); now = int(time.time())
+        with self._lock:
+            r = self._con.execute("SELECT tile_data FROM tiles WHERE layer=? AND zoom_level=? AND tile_column=? AND tile_row=?", k).fetchone()
+            if r is None:
+                self.misses += 1; return None
+            self.hits += 1
+            self._con.execute("UPDATE tiles SET last_access=? WHERE layer=? AND zoom_level=? AND tile_column=? AND tile_row=? AND last_access<?",
+                              (now,) + k + (now - 60,))
+            return r[0]
+
+    def put(self, layer: str, z: int, x: int, y: int, data: bytes):
+        k = self._key(layer, z, x, y)
+        with self._lock:
+            old = self._con.execute("SELECT size FROM tiles WHERE layer=? AND zoom_level=? AND tile_column=? AND tile_row=?", k).fetchone()
+            self._con.execute("INSERT OR REPLACE INTO tiles VALUES (?,?,?,?,?,?,?)", k + (data, len(data), int(time.time())))
+            self._size += len(data) - (old[0] if old else 0)
+            if self._size > self.max_bytes: self._evict()
+
+    def _evict(self):
+        target = int(self.max_bytes * 0.9)
+        self._con.execute("BEGIN")
+        try:
+            while self._size > target:
+                rows = self._con.execute("SELECT layer, zoom_level, tile_column, tile_row, size FROM tiles ORDER BY last_access LIMIT 256").fetchall()
+                if not rows: break
+                drop = []
+                for r in rows:
+                    if self._size <= target: break
+                    drop.append(r[:4]); self._size -= r[4]
+                self._con.executemany("DELETE FROM tiles WHERE layer=? AND zoom_level=? AND tile_column=? AND tile_row=?", drop)
+                self.evicted += len(drop)
+            self._con.execute("COMMIT")
+        except Exception:
+            self._con.execute("ROLLBACK"); raise
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            meta = dict(self._con.execute("SELECT name, value FROM metadata"))
+            n = self._con.execute("SELECT count(*) FROM tiles").fetchone()[0]
+        return {"tiles": n, "bytes": self._size, "max_bytes": self.max_bytes, "hits": self.hits, "misses": self.misses,
+                "evicted": self.evicted, "total_hits": int(meta.get("hits", 0)) + self.hits, "total_misses": int(meta.get("misses", 0)) + self.misses}
+
+    def close(self):
+        with self._lock:
+            self._con.execute("UPDATE metadata SET value = CAST(value AS INTEGER) + ? WHERE name = 'hits'", (self.hits,))
+            self._con.execute("UPDATE metadata SET value = CAST(value AS INTEGER) + ? WHERE name = 'misses'", (self.misses,))
+            self.hits = self.misses = 0; self._con.close()
+
+class TileProxy:
+    """127.0.0.1 üzerinde karo uç noktası: /tiles/<katman>/<z>/<x>/<y>. Önce TileCache, yoksa kaynaktan çekip saklar.
+
+    Harita sayfaları karoları buradan ister; sources (katman -> kaynak adresi) testlerde yerel bir
+    sunucuya yönlendirilebilir.
+    """
+    def __init__(self, cache: TileCache, sources: Optional[Dict[str, str]] = None, port: int = 0, timeout: float = 15):
+        from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+        from requests.adapters import HTTPAdapter
+        self.cache = cache; self.timeout = timeout; self.errors = 0
+        self.sources = sources or {k: v[1] for k, v in TILE_SOURCES.items()}
+        self.session = requests.Session(); self.session.headers.update(API_HEADERS)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        self.session.mount("https://", adapter); self.session.mount("http://", adapter)
+        proxy = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parts = self.path.split("?")[0].strip("/").split("/")
+                try:
+                    if len(parts) != 5 or parts[0] != "tiles": raise ValueError(self.path)
+                    layer = parts[1]; z, x, y = int(parts[2]), int(parts[3]), int(parts[4].split(".")[0])
+                    data = proxy.fetch(layer, z, x, y)
+                except (ValueError, KeyError):
+                    self.send_error(404); return
+                if data is None:
+                    self.send_error(502); return
+                self.send_response(200)
+                self.send_header("Content-Type", "image/jpeg" if data[:2] == b"\xff\xd8" else "image/png")
+                self.send_header("Content-Length", str(len(data))); self.send_header("Cache-Control", "max-age=86400")
+                self.send_header("Access-Control-Allow-Origin", "*"); self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler); self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self._thread = threading.Thread(target=self.server.serve_forever, name="tiles", daemon=True)
+
+    def start(self) -> "TileProxy":
+        self._thread.start(); return self
+
+    def url_template(self, layer: str) -> str:
+        return f"http://127.0.0.1:{self.port}/tiles/{layer}/{{z}}/{{x}}/{{y}}"
+
+    def fetch(self, layer: str, z: int, x: int, y: int) -> Optional[bytes]:
+        src = self.sources[layer]
+        if not (0 <= z <= 22 and 0 <= x < (1 << z) and 0 <= y < (1 << z)): raise ValueError((z, x, y))
+        data = self.cache.get(layer, z, x, y)
+        if data is not None: return data
+        try:
+            r = self.session.get(src.format(z=z, x=x, y=y), timeout=self.timeout); r.raise_for_status()
+        except requests.RequestException as ex:
+            self.errors += 1; logger.info(f"Karo alınamadı {layer}/{z}/{x}/{y}: {ex}"); return None
+        self.cache.put(layer, z, x, y, r.content)
+        return r.content
+
+    def close(self):
+        st = self.cache.stats()
+        logger.info(f"Karo önbelleği: {st['hits']} isabet, {st['misses']} ıska, {self.errors} hata, {st['tiles']} karo, {st['bytes'] / 1e6:.1f} MB")
+        self.server.shutdown(); self.server.server_close(); self.cache.close()
+
+_TILE_PROXY: Optional[TileProxy] = None
+_TILE_PROXY_LOCK = threading.Lock()
+
+def tile_proxy() -> TileProxy:
+    """Süreç genelinde tek karo vekili; ilk kullanımda ayarlarla başlatılır, çıkışta kapanır."""
+    global _TILE_PROXY
+    with _TILE_PROXY_LOCK:
+        if _TILE_PROXY is None:
+            mb = float(load_settings().get("tile_cache_mb", 512))
+            _TILE_PROXY = TileProxy(TileCache(max_bytes=int(mb * (1 << 20)))).start()
+            atexit.register(_TILE_PROXY.close)
+        return _TILE_PROXY
+
+def tile_range(bbox: Tuple[float, float, float, float], z: int) -> Tuple[int, int, int, int]:
+    """bbox'u kapsayan karo aralığı (x0, x1, y0, y1), uçlar dahil."""
+    def xy(lat: float, lon: float) -> Tuple[int, int]:
+        n = 1 << z; r = math.radians(lat)
+        return (min(n - 1, int((lon + 180.0) / 360.0 * n)),
+                min(n - 1, int((1.0 - math.asinh(math.tan(r)) / math.pi) / 2.0 * n)))
+    x0, y0 = xy(bbox[2], bbox[1]); x1, y1 = xy(bbox[0], bbox[3])
+    return x0, x1, y0, y1
+
+def prefetch_tiles(proxy: TileProxy, layer: str = "osm", zmin: int = 5, zmax: int = 10,
+                   bbox: Tuple[float, float, float, float] = TURKEY_BBOX, workers: int = 2, on_progress=None) -> Dict[str, int]:
+    """bbox'taki tüm karoları önbelleğe alır; önbellekte olanlar için kaynağa gidilmez."""
+    from concurrent.futures import ThreadPoolExecutor
+    jobs = []
+    for z in range(zmin, zmax + 1):
+        x0, x1, y0, y1 = tile_range(bbox, z)
+        jobs.extend((z, x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1))
+    out = {"total": len(jobs), "cached": 0, "fetched": 0, "failed": 0}
+    h0 = proxy.cache.hits
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch") as ex:
+        for i, data in enumerate(ex.map(lambda j: proxy.fetch(layer, *j), jobs), 1):
+            if data is None: out["failed"] += 1
+            if on_progress and (i % 100 == 0 or i == len(jobs)): on_progress(i, out)
+    out["cached"] = proxy.cache.hits - h0; out["fetched"] = out["total"] - out["cached"] - out["failed"]
+    return out
+
+def run_tiles_cli(action: str, layer: str, zmin: int, zmax: int, workers: int) -> int:
+    proxy = tile_proxy()
+    if action == "prefetch":
+        res = prefetch_tiles(proxy, layer, zmin, zmax, workers=workers,
+                             on_progress=lambda i, o: print(f"[{i}/{o['total']}] {o['failed']} hata", flush=True))
+        print(f"Bitti: {res['total']} karo, {res['cached']} zaten önbellekte, {res['fetched']} indirildi, {res['failed']} hata")
+        rc = 1 if res["failed"] else 0
+    else:
+        rc = 0
+    st = proxy.cache.stats()
+    print(f"Önbellek: {st['tiles']} karo, {st['bytes'] / 1e6:.1f} / {st['max_bytes'] / 1e6:.0f} MB, "
+          f"toplam {st['total_hits']} isabet / {st['total_misses']} ıska")
+    return rc
+
+# ------------------------
+# Sunucu tarafı kümeleme
+# ------------------------
+SERVER_CLUSTERS = "Sunucu"
+CLUSTER_MAX_ZOOM = 16       # bunun üstünde kümeleme yapılmaz, görünümdeki olaylar tek tek döner
+CLUSTER_CELL_BITS = 2       # z düzeyinde eksen başına 2^(z+2) hücre: 256 px karoda 64 px'lik hücreler
+CLUSTER_MAX_POINTS = 5000   # tekil olay yanıtının üst sınırı (büyükten küçüğe)
+_CLUSTER_FIELDS = ("key", "n", "sx", "sy", "mm", "rep")
+
+def _mercator(lon, lat):
+    """Boylam/enlem dizilerini [0, 1) Web Mercator koordinatlarına çevirir; y kuzeyden güneye artar."""
+    x = (np.asarray(lon, dtype=np.float64) + 180.0) / 360.0
+    s = np.sin(np.radians(np.clip(np.asarray(lat, dtype=np.float64), -85.0511, 85.0511)))
+    y = 0.5 - np.log((1 + s) / (1 - s)) / (4 * math.pi)
+    return np.clip(x, 0.0, 1.0 - 1e-12), np.clip(y, 0.0, 1.0 - 1e-12)
+
+def _unmercator(x, y):
+    return x * 360.0 - 180.0, np.degrees(np.arctan(np.sinh(math.pi * (1.0 - 2.0 * y))))
+
+_MORTON_MASKS = ((16, 0x0000FFFF0000FFFF), (8, 0x00FF00FF00FF00FF), (4, 0x0F0F0F0F0F0F0F0F), (2, 0x3333333333333333), (1, 0x5555555555555555))
+
+def _morton(cx, cy):
+    """Hücre koordinatlarının Z-sırası anahtarı; üst düzeydeki hücrenin anahtarı key >> 2'dir."""
+    def spread(v):
+        v = np.asarray(v, dtype=np.uint64)
+        for shift, mask in _MORTON_MASKS: v = (v | (v << np.uint64(shift))) & np.uint64(mask)
+        return v
+    return (spread(cx) << np.uint64(1)) | spread(cy)
+
+_UNMORTON_MASKS = ((1, 0x3333333333333333), (2, 0x0F0F0F0F0F0F0F0F), (4, 0x00FF00FF00FF00FF), (8, 0x0000FFFF0000FFFF), (16, 0x00000000FFFFFFFF))
+
+def _unmorton(key):
+    def compact(v):
+        v = np.asarray(v, dtype=np.uint64) & np.uint64(0x5555555555555555)
+        for shift, mask in _UNMORTON_MASKS: v = (v | (v >> np.uint64(shift))) & np.uint64(mask)
+        return v
+    return compact(key >> np.uint64(1)), compact(key)
+
+def _cluster_reduce(lv: Dict[str, Any]) -> Dict[str, Any]:
+    """Sıralı anahtarda aynı hücreye düşen girdileri birleştirir: sayı ve koordinat toplamları, en büyük olay temsilci olur."""
+    key = lv["key"]
+    if not len(key): return lv
+    start = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    mm = np.maximum.reduceat(lv["mm"], start)
+    hit = np.flatnonzero(lv["mm"] == np.repeat(mm, np.diff(np.r_[start, len(key)])))
+    grp = np.searchsorted(start, hit, side="right") - 1
+    first = hit[np.r_[True, grp[1:] != grp[:-1]]]
+    return {"key": key[start], "n": np.add.reduceat(lv["n"], start), "sx": np.add.reduceat(lv["sx"], start),
+            "sy": np.add.reduceat(lv["sy"], start), "mm": mm, "rep": lv["rep"][first]}
+
+def _cluster_merge(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+    """b düzeyini (yeni olaylar) a'ya katar: var olan hücreler yerinde güncellenir, yeniler sıralı yerlerine eklenir."""
+    if not len(a["key"]): return b
+    i = np.searchsorted(a["key"], b["key"])
+    hit = i < len(a["key"]); hit[hit] = a["key"][i[hit]] == b["key"][hit]
+    h = i[hit]
+    for f in ("n", "sx", "sy"): a[f][h] += b[f][hit]
+    better = b["mm"][hit] > a["mm"][h]
+    a["mm"][h[better]] = b["mm"][hit][better]; a["rep"][h[better]] = b["rep"][hit][better]
+    miss = ~hit
+    return {f: np.insert(a[f], i[miss], b[f][miss]) for f in _CLUSTER_FIELDS}
+
+class ClusterIndex:
+    """Yerel kataloğun supercluster benzeri çok çözünürlüklü ızgara kümeleri (0..max_zoom, NumPy dizileri).
+
+    Her düzey 64 px'lik hücrelerden oluşur ve Morton anahtarına göre sıralıdır; üst düzey alttakinin
+    anahtarını iki bit kaydırıp indirgeyerek yeniden sıralama olmadan kurulur. Hücre başına olay sayısı,
+    ağırlık merkezi için koordinat toplamları ve en büyük olay (rowid) tutulur. time_range verilirse
+    yalnızca o event_ts aralığındaki olaylar alınır. sync() earthquakes tablosuna rowid sırasıyla eklenen
+    satırları okuyup düzeylere katar; var olan bir olay güncellenmiş ya da silinmişse (earthquakes_revision
+    sayacı değişmişse; yazan başka bir bağlantı ya da süreç olabilir) dizin baştan kurulur.
+    query() yalnızca görünümdeki hücreleri döndürür.
+    """
+    def __init__(self, min_mag: float = 0.0, max_zoom: int = CLUSTER_MAX_ZOOM, time_range: Optional[Tuple[int, int]] = None):
+        self.min_mag = min_mag; self.max_zoom = max_zoom; self.time_range = time_range; self.db_path = DB_PATH
+        self.last_rowid = 0; self.revision: Optional[int] = None; self.size = 0
+        self._lock = threading.Lock(); self._sync_lock = threading.Lock()
+        self.levels: List[Dict[str, Any]] = []; self._points: Dict[str, Any] = {}
+        self._reset()
+
+    def _reset(self):
+        empty = {"key": np.empty(0, np.uint64), "n": np.empty(0, np.int64), "sx": np.empty(0), "sy": np.empty(0),
+                 "mm": np.empty(0), "rep": np.empty(0, np.int64)}
+        self.levels = [dict(empty) for _ in range(self.max_zoom + 1)]
+        self._points = {"rowid": np.empty(0, np.int64), "x": np.empty(0), "y": np.empty(0), "mag": np.empty(0)}
+        self.size = 0
+
+    def _read(self, after: int, upto: int) -> Dict[str, Any]:
+        sql = ("SELECT rowid, lon, lat, coalesce(mag, 0) FROM earthquakes WHERE rowid > ? AND rowid <= ? "
+               "AND lon IS NOT NULL AND lat IS NOT NULL AND coalesce(mag, 0) >= ?")
+        params: List[Any] = [after, upto, self.min_mag]
+        if self.time_range:
+            sql += " AND event_ts >= ? AND event_ts < ?"; params.extend(self.time_range)
+        cur = db_connect().execute(sql + " ORDER BY rowid", params)
+        chunks = []
+        while True:
+            rows = cur.fetchmany(100_000)
+            if not rows: break
+            chunks.append(np.array(rows, dtype=np.float64))
+        a = np.concatenate(chunks) if chunks else np.empty((0, 4))
+        x, y = _mercator(a[:, 1], a[:, 2])
+        return {"rowid": a[:, 0].astype(np.int64), "x": x, "y": y, "mag": a[:, 3]}
+
+    def _build_levels(self, pts: Dict[str, Any]) -> List[Dict[str, Any]]:
+        scale = float(1 << (self.max_zoom + CLUSTER_CELL_BITS))
+        key = _morton((pts["x"] * scale).astype(np.uint64), (pts["y"] * scale).astype(np.uint64))
+        o = np.argsort(key, kind="stable")
+        lv = _cluster_reduce({"key": key[o], "n": np.ones(len(o), np.int64), "sx": pts["x"][o], "sy": pts["y"][o],
+                              "mm": pts["mag"][o], "rep": pts["rowid"][o]})
+        levels = [lv]
+        for _ in range(self.max_zoom):
+            lv = _cluster_reduce(dict(lv, key=lv["key"] >> np.uint64(2))); levels.append(lv)
+        return levels[::-1]
+
+    def sync(self) -> int:
+        """Yeni satırları dizine katar; katılan olay sayısını döndürür (baştan kurulumda tamamı)."""
+        with self._sync_lock:
+            con = db_connect(); con.execute("BEGIN")
+            try:
+                # Sayaç ve rowid aynı anlık görüntüden okunur
+                rev = con.execute("SELECT n FROM earthquakes_revision").fetchone()[0]
+                upto = con.execute("SELECT coalesce(max(rowid), 0) FROM earthquakes").fetchone()[0]
+            finally:
+                con.execute("COMMIT")
+            full = rev != self.revision
+            after = 0 if full else self.last_rowid
+            if upto <= after and not full: return 0
+            pts = self._read(after, upto); levels = self._build_levels(pts)
+            with self._lock:
+                if full:
+                    self._reset()
+                if self.size:
+                    self.levels = [_cluster_merge(a, b) for a, b in zip(self.levels, levels)]
+                    self._points = {f: np.concatenate((self._points[f], pts[f])) for f in self._points}
+                else:
+                    self.levels = levels; self._points = pts
+                self.size = len(self._points["rowid"]); self.last_rowid = upto; self.revision = rev
+            return len(pts["rowid"])
 
-def fetch_live_earthquakes() -> List[Dict[str, Any]]:
-    return api_get(API_LIVE)
+    def query(self, zoom: int, bbox: Tuple[float, float, float, float]) -> Tuple[Dict[str, Any], Any]:
+        """bbox (batı, güney, doğu, kuzey) içindeki kümeler (lon, lat, n, mm) ve tekil olayların rowid'leri."""
+        (x0, x1), (y1, y0) = _mercator([max(bbox[0], -180.0), min(bbox[2], 180.0)], [bbox[1], bbox[3]])
+        with self._lock:
+            if zoom > self.max_zoom:
+                p = self._points
+                m = (p["x"] >= x0) & (p["x"] <= x1) & (p["y"] >= y0) & (p["y"] <= y1)
+                ids, mags = p["rowid"][m], p["mag"][m]
+                if len(ids) > CLUSTER_MAX_POINTS: ids = ids[np.argsort(-mags, kind="stable")[:CLUSTER_MAX_POINTS]]
+                return {"lon": np.empty(0), "lat": np.empty(0), "n": np.empty(0, np.int64), "mm": np.empty(0)}, ids
+            lv = self.levels[max(zoom, 0)]; scale = float(1 << (max(zoom, 0) + CLUSTER_CELL_BITS))
+            c = np.array([x0, x1, y0, y1]) * scale
+            cx0, cx1, cy0, cy1 = (int(v) for v in np.minimum(c, scale - 1))
+            # Dikdörtgendeki tüm hücreler köşe anahtarları arasındadır; aradaki fazlalık koordinatla elenir
+            lo, hi = _morton([cx0, cx1], [cy0, cy1])
+            a, b = np.searchsorted(lv["key"], lo, "left"), np.searchsorted(lv["key"], hi, "right")
+            cx, cy = _unmorton(lv["key"][a:b])
+            m = (cx >= cx0) & (cx <= cx1) & (cy >= cy0) & (cy <= cy1)
+            sel = {f: lv[f][a:b][m] for f in ("n", "sx", "sy", "mm", "rep")}
+        one = sel["n"] == 1; many = ~one; n = sel["n"][many]
+        lon, lat = _unmercator(sel["sx"][many] / n, sel["sy"][many] / n)
+        return {"lon": lon, "lat": lat, "n": n, "mm": sel["mm"][many]}, sel["rep"][one]
 
-def fetch_archive_earthquakes(date_yyyy_mm_dd: str) -> List[Dict[str, Any]]:
-    return api_get(API_ARCHIVE, params={"date": date_yyyy_mm_dd})
+    def __str__(self):
+        scope = f"{self.time_range[0]}..{self.time_range[1]}" if self.time_range else "tüm katalog"
+        return f"{self.size} olay, M>={self.min_mag:g}, {scope}, z0-{self.max_zoom}"
 
-def mag_to_color(m: float) -> str:
-    if m >= 7: return "darkred"
-    if m >= 6: return "red"
-    if m >= 5: return "orange"
-    if m >= 4: return "yellow"
-    if m >= 3: return "lightgreen"
-    return "blue"
+_CLUSTER_INDEX: Optional[ClusterIndex] = None
+_CLUSTER_LOCK = threading.Lock()
 
-def play_sound_effect(sound_file):
-    if not HAS_QT_SOUND:
-        logger.warning("QSoundEffect kütüphanesi bulunamadı.")
-        return
-    if not os.path.exists(sound_file):
-        logger.warning(f"Ses dosyası bulunamadı: {sound_file}")
-        return
-    
+def cluster_sync(min_mag: float, time_range: Optional[Tuple[int, int]] = None) -> Tuple[ClusterIndex, bool]:
+    """Geçerli dizini eşitler (min_mag, zaman aralığı ya da DB değiştiyse yenisini kurar); (dizin, görünüm değişti mi)."""
+    global _CLUSTER_INDEX
+    with _CLUSTER_LOCK:
+        idx = _CLUSTER_INDEX
+        fresh = idx is None or idx.min_mag != min_mag or idx.time_range != time_range or idx.db_path != DB_PATH
+        if fresh: idx = ClusterIndex(min_mag, time_range=time_range)
+        added = idx.sync()
+        # Yeni dizin kurulana dek şema işleyicisi eskisinden yanıt verir
+        _CLUSTER_INDEX = idx
+    return idx, fresh or added > 0
+
+def _cluster_rows(where: str, params: List[Any]) -> List[Dict[str, Any]]:
+    return [{"type": "Feature", "id": gid, "geometry": {"type": "Point", "coordinates": [lon, lat]},
+             "properties": {"m": mag, "d": depth, "t": title, "dt": date}}
+            for gid, lon, lat, mag, depth, title, date in db_connect().execute(
+                f"SELECT earthquake_id, lon, lat, mag, depth, title, date FROM earthquakes WHERE {where}", params)]
+
+def cluster_geojson(idx: Optional[ClusterIndex], zoom: int, bbox: Tuple[float, float, float, float],
+                    focus: Optional[str] = None) -> Dict[str, Any]:
+    """Görünümün FeatureCollection'ı: kümeler {n, m (en büyük)}, tekil olaylar eq_geojson özellikleriyle.
+
+    focus verilirse o olay bir kümenin içinde kalsa da tekil olarak eklenir (sayfadaki vurgulama için).
+    """
+    feats: List[Dict[str, Any]] = []
+    if idx is not None:
+        cl, ids = idx.query(zoom, bbox)
+        feats = [{"type": "Feature", "geometry": {"type": "Point", "coordinates": [lon, lat]}, "properties": {"n": n, "m": mm}}
+                 for lon, lat, n, mm in zip(cl["lon"].tolist(), cl["lat"].tolist(), cl["n"].tolist(), cl["mm"].tolist())]
+        ids = ids.tolist()
+        for i in range(0, len(ids), 500):
+            part = ids[i:i+500]
+            feats.extend(_cluster_rows(f"rowid IN ({','.join('?' * len(part))})", part))
+    if focus and not any(f.get("id") == focus for f in feats):
+        feats.extend(_cluster_rows("earthquake_id = ?", [focus]))
+    return {"type": "FeatureCollection", "features": feats}
+
+def cluster_response(query: str) -> Optional[Tuple[bytes, str]]:
+    """deprem://map/clusters?z=<zoom>&bbox=<batı,güney,doğu,kuzey>[&focus=<id>] yanıtı."""
+    from urllib.parse import parse_qs
+    q = parse_qs(query)
     try:
-        effect = QSoundEffect()
-        effect.setSource(QUrl.fromLocalFile(sound_file))
-        effect.setLoopCount(1)
-        effect.setVolume(1.0)
-        effect.play()
-    except Exception as ex:
-        logger.error(f"Ses çalınırken hata oluştu: {ex}")
+        zoom = int(q["z"][0]); bbox = tuple(float(v) for v in q["bbox"][0].split(","))
+    except (KeyError, ValueError):
+        return None
+    if len(bbox) != 4: return None
+    fc = cluster_geojson(_CLUSTER_INDEX, zoom, bbox, (q.get("focus") or [None])[0])
+    return json.dumps(fc, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), "application/json"
 
-# ------------------------
-# SQLite
-# ------------------------
-def db_init():
-    con = sqlite3.connect(DB_PATH)
-    cur = con.cursor()
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS earthquakes(
-            earthquake_id TEXT PRIMARY KEY,
-            provider TEXT,
-            title TEXT,
-            date TEXT,
-            mag REAL,
-            depth REAL,
-            lon REAL,
-            lat REAL,
-            created_at INTEGER,
-            closestCity_name TEXT,
-            closestCity_code INTEGER,
-            closestCity_distance REAL,
-            closestCity_population INTEGER,
-            epiCenter_name TEXT,
-            airports_json TEXT
-        )
-    """)
-    con.commit()
-    con.close()
+# Görünüm her değiştiğinde (moveend) kümeler deprem://map/clusters'tan istenir; yalnızca son istek çizilir.
+# window.quakeMap.update() görünümü yeniden ister; focus(id, zoom, [lat, lon]) konuma uçar ve olayı tekil olarak vurgular.
+_QUAKE_CLUSTERS_JS = """
+{% macro header(this, kwargs) %}
+<style>
+.quake-cluster { background: rgba(241, 128, 23, 0.35); border-radius: 50%; }
+.quake-cluster div { margin: 4px; border-radius: 50%; background: rgba(240, 100, 20, 0.75); color: #fff;
+                     font: bold 12px sans-serif; display: flex; align-items: center; justify-content: center; height: calc(100% - 8px); }
+</style>
+{% endmacro %}
+{% macro script(this, kwargs) %}
+(function() {""" + _QUAKE_JS_COMMON + """
+    var map = {{ this.map }}, renderer = L.canvas({padding: 0.5}), byId = {}, want = null, seq = 0;
+    function icon(n) {
+        var s = n < 100 ? 32 : n < 1000 ? 40 : 48;
+        return L.divIcon({html: "<div>" + (n < 10000 ? n : Math.round(n / 1000) + "k") + "</div>", className: "quake-cluster", iconSize: [s, s]});
+    }
+    var {{ this.get_name() }} = L.geoJSON(null, {
+        pointToLayer: function(f, ll) {
+            var p = f.properties;
+            if (p.n > 1) return L.marker(ll, {icon: icon(p.n), title: p.n + " olay, en büyük M" + (+p.m).toFixed(1)});
+            return marker(f, ll, renderer);
+        },
+        onEachFeature: function(f, l) {
+            if (f.properties.n > 1) { l.on("click", function() { map.flyTo(l.getLatLng(), map.getZoom() + 2); }); return; }
+            byId[f.id] = l; l.bindPopup(html(f.properties), {maxWidth: 300}).bindTooltip(html(f.properties));
+        }
+    }).addTo(map);
+    var layer = {{ this.get_name() }};
+    function load() {
+        var b = map.getBounds(), r = new XMLHttpRequest(), my = ++seq;
+        var bbox = [b.getWest(), b.getSouth(), b.getEast(), b.getNorth()].map(function(v) { return v.toFixed(5); }).join(",");
+        r.open("GET", "{{ this.url }}?z=" + map.getZoom() + "&bbox=" + bbox + (want ? "&focus=" + encodeURIComponent(want) : ""));
+        r.onload = function() {
+            if (my !== seq) return;
+            var d; try { d = JSON.parse(r.responseText); } catch (e) { return; }
+            hl = null; byId = {}; layer.clearLayers(); layer.addData(d);
+            if (want && byId[want]) highlight(byId[want]);
+            want = null;
+        };
+        r.send();
+    }
+    map.on("moveend", load);
+    load();
+    window.quakeMap = {
+        layer: layer,
+        update: function() { load(); return Object.keys(byId).length; },
+        focus: function(id, zoom, ll) {
+            if (!ll) return false;
+            want = id; map.flyTo(ll, Math.max(map.getZoom(), zoom || 9), {duration: 0.6});
+            return true;
+        }
+    };
+})();
+{% endmacro %}
+"""
 
-def db_upsert_earthquakes(items: List[Dict[str, Any]]):
-    con = sqlite3.connect(DB_PATH)
-    cur = con.cursor()
-    for e in items:
-        try:
-            gid = e.get("earthquake_id") or ""
-            prov = e.get("provider") or ""
-            title = e.get("title") or ""
-            date = e.get("date") or e.get("date_time") or ""
-            mag = float(e.get("mag") or 0)
-            depth = float(e.get("depth") or 0)
-            geo = e.get("geojson", {}).get("coordinates", [0,0])
-            lon = float(geo[0]) if len(geo)>0 else 0.0
-            lat = float(geo[1]) if len(geo)>1 else 0.0
-            created_at = int(e.get("created_at") or int(time.time()))
-            lp = e.get("location_properties", {}) or {}
-            cc = lp.get("closestCity", {}) or {}
-            cc_name = cc.get("name")
-            cc_code = cc.get("cityCode")
-            cc_dist = cc.get("distance")
-            cc_pop = cc.get("population")
-            epi = lp.get("epiCenter", {}) or {}
-            epi_name = epi.get("name")
-            airports = lp.get("airports", []) or []
-            airports_json = json.dumps(airports, ensure_ascii=False)
-            cur.execute("""
-                INSERT INTO earthquakes
-                (earthquake_id, provider, title, date, mag, depth, lon, lat, created_at,
-                 closestCity_name, closestCity_code, closestCity_distance, closestCity_population,
-                 epiCenter_name, airports_json)
-                VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
-                ON CONFLICT(earthquake_id) DO UPDATE SET
-                  provider=excluded.provider,
-                  title=excluded.title,
-                  date=excluded.date,
-                  mag=excluded.mag,
-                  depth=excluded.depth,
-                  lon=excluded.lon,
-                  lat=excluded.lat,
-                  created_at=excluded.created_at,
-                  closestCity_name=excluded.closestCity_name,
-                  closestCity_code=excluded.closestCity_code,
-                  closestCity_distance=excluded.closestCity_distance,
-                  closestCity_population=excluded.closestCity_population,
-                  epiCenter_name=excluded.epiCenter_name,
-                  airports_json=excluded.airports_json
-            """, (gid, prov, title, date, mag, depth, lon, lat, created_at,
-                  cc_name, cc_code, cc_dist, cc_pop, epi_name, airports_json))
-        except Exception as ex:
-            logger.info(f"DB upsert error: {ex}")
-    con.commit(); con.close()
+if HAS_FOLIUM:
+    class QuakeClusters(MacroElement):
+        """Sunucu kümeleri katmanı: sayfa veri taşımaz, görünümdeki kümeleri cluster_response()'tan ister."""
+        _template = Template(_QUAKE_CLUSTERS_JS)
 
-def db_fetch_last(limit: int = 200) -> List[Dict[str, Any]]:
-    con = sqlite3.connect(DB_PATH)
-    con.row_factory = sqlite3.Row
-    cur = con.cursor()
-    cur.execute("SELECT * FROM earthquakes ORDER BY created_at DESC LIMIT ?", (limit,))
-    rows = [dict(r) for r in cur.fetchall()]
-    con.close()
-    return rows
+        def __init__(self):
+            super().__init__()
+            self._name = "QuakeClusters"
+
+        @property
+        def url(self) -> str:
+            return f"{MAP_SCHEME.decode()}://map/clusters"
+
+        @property
+        def map(self) -> str:
+            return self._parent.get_name()
 
 # ------------------------
 # UI bileşenleri
@@ -264,95 +2407,165 @@ class HomeTab(QWidget):
         v.addWidget(QLabel("<h2>Deprem Gözlem'e Hoş Geldiniz</h2>"))
         self.lbl_last = QLabel("En son deprem: —"); self.lbl_stats = QLabel("Toplam: 0 | Ortalama M: — | En büyük: —")
         v.addWidget(self.lbl_last); v.addWidget(self.lbl_stats); v.addStretch(1)
-    def update_overview(self, eqs: List[Dict[str, Any]]):
-        if not eqs:
+    def update_overview(self, store: EventStore):
+        mags = store.col("mag", VIEW_ROWS); n = len(mags)
+        if not n:
             self.lbl_last.setText("En son deprem: —"); self.lbl_stats.setText("Toplam: 0 | Ortalama M: — | En büyük: —"); return
-        e0 = eqs[0]; self.lbl_last.setText(f"En son deprem: M{float(e0.get('mag') or 0):.1f} — {e0.get('title','')}\n{e0.get('date','')}")
-        mags = [float(e.get("mag") or 0) for e in eqs]; avg = sum(mags)/len(mags) if mags else 0
-        emax = max(eqs, key=lambda x: float(x.get("mag") or 0))
-        self.lbl_stats.setText(f"Toplam: {len(eqs)} | Ortalama M: {avg:.2f} | En büyük: M{float(emax.get('mag') or 0):.1f} ({emax.get('title','')})")
+        titles = store.col("title"); dates = store.col("date")
+        self.lbl_last.setText(f"En son deprem: M{mags[0]:.1f} — {titles[0]}\n{dates[0]}")
+        imax = max(range(n), key=mags.__getitem__)
+        self.lbl_stats.setText(f"Toplam: {n} | Ortalama M: {sum(mags)/n:.2f} | En büyük: M{mags[imax]:.1f} ({titles[imax]})")
 
 class MapGeneratorWorker(QObject):
-    finished = Signal(str)
+    finished = Signal(object)
     error = Signal(str)
+    cancelled = Signal()
 
-    def __init__(self, mode, date_str, min_mag, cluster_mode, tiles_url):
+    def __init__(self, source: MapSource, min_mag, cluster_mode, tiles_url, cancel: Optional[threading.Event] = None, geojson: bool = True,
+                 base=None, tile_cache: bool = False):
         super().__init__()
-        self.mode = mode
-        self.date_str = date_str
+        self.tile_cache = tile_cache
+        # base(): yüklü sayfanın (page_key, shown) çifti ya da None; iş başlarken okunur
+        self.base = base
+        self.geojson = geojson
+        self.cancel = cancel or threading.Event()
+        self.source = source
         self.min_mag = min_mag
         self.cluster_mode = cluster_mode
         self.tiles_url = tiles_url
 
+    @staticmethod
+    def _add_markers(target, recs: List[Earthquake]):
+        for e in recs:
+            popup_html = eq_popup_html(e)
+            folium.CircleMarker(location=[e.lat, e.lon], radius=max(4, e.mag*1.5), color=mag_to_color(e.mag), fill=True,
+                                fill_opacity=0.7, popup=folium.Popup(popup_html, max_width=300), tooltip=popup_html).add_to(target)
+
     def run(self):
         if not HAS_FOLIUM:
             self.error.emit("Folium kütüphanesi bulunamadı.")
             return
         
         try:
-            if self.mode == "Canlı Veri":
-                eqs = fetch_live_earthquakes()
-            else:
-                eqs = fetch_archive_earthquakes(self.date_str)
-            
-            db_upsert_earthquakes(eqs)
-            
-            eqs_f = [e for e in eqs if float(e.get("mag") or 0) >= self.min_mag]
-            
-            attr = None
-            tiles_to_use = self.tiles_url
-            if tiles_to_use == "Esri Dünya Uydu":
-                tiles_to_use = "https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}"
-                attr = "Tiles © Esri"
-
-            if eqs_f:
-                first = eqs_f[0]; coords = first.get("geojson", {}).get("coordinates", [35.0,39.0])
-                lon = float(coords[0]); lat = float(coords[1]); m = folium.Map(location=[lat,lon], zoom_start=6, tiles=tiles_to_use, attr=attr)
-            else:
-                m = folium.Map(location=[39.0,35.0], zoom_start=6, tiles=tiles_to_use, attr=attr)
-
-            if self.cluster_mode == "MarkerCluster":
-                mc = MarkerCluster(); m.add_child(mc)
-                for e in eqs_f:
-                    coords = e.get("geojson", {}).get("coordinates", [0,0]); lon, lat = float(coords[0]), float(coords[1])
-                    color = mag_to_color(float(e.get("mag") or 0))
-                    popup_html = f"""
-                        <b>Büyüklük:</b> M{float(e.get('mag') or 0):.1f}<br>
-                        <b>Konum:</b> {e.get('title','')}<br>
-                        <b>Tarih:</b> {e.get('date','')}<br>
-                        <b>Derinlik:</b> {float(e.get('depth') or 0):.1f} km
-                    """
-                    popup = folium.Popup(popup_html, max_width=300)
-                    folium.CircleMarker(location=[lat,lon], radius=max(4,float(e.get('mag') or 0)*1.5),
-                                        color=color, fill=True, fill_opacity=0.7, popup=popup, tooltip=popup_html).add_to(mc)
-            elif self.cluster_mode == "HeatMap":
-                heat = []
-                for e in eqs_f:
-                    coords = e.get("geojson", {}).get("coordinates", [0,0]); lon, lat = float(coords[0]), float(coords[1])
-                    heat.append([lat, lon, float(e.get("mag") or 0)])
-                if heat: HeatMap(heat, radius=18).add_to(m)
-            else:
-                for e in eqs_f:
-                    coords = e.get("geojson", {}).get("coordinates", [0,0]); lon, lat = float(coords[0]), float(coords[1])
-                    color = mag_to_color(float(e.get("mag") or 0))
-                    popup_html = f"""
-                        <b>Büyüklük:</b> M{float(e.get('mag') or 0):.1f}<br>
-                        <b>Konum:</b> {e.get('title','')}<br>
-                        <b>Tarih:</b> {e.get('date','')}<br>
-                        <b>Derinlik:</b> {float(e.get('depth') or 0):.1f} km
-                    """
-                    popup = folium.Popup(popup_html, max_width=300)
-                    folium.CircleMarker(location=[lat,lon], radius=max(4,float(e.get('mag') or 0)*1.5),
-                                        color=color, fill=True, fill_opacity=0.7, popup=popup, tooltip=popup_html).add_to(m)
+            if self.cluster_mode == SERVER_CLUSTERS:
+                self._run_server_clusters(); return
+            t0 = time.perf_counter()
+            recs = self.source.load(self.min_mag)
+            logger.info(f"Harita verisi: {self.source}, {len(recs)} kayıt, {(time.perf_counter() - t0) * 1000:.1f} ms")
+            if self.cancel.is_set(): self.cancelled.emit(); return
             
-            folium.LayerControl().add_to(m)
-            fd, path = tempfile.mkstemp(suffix=".html"); os.close(fd)
-            m.save(path)
-            self.finished.emit(path)
+            key = (self.cluster_mode, self.tiles_url)
+            shown = {e.earthquake_id: (e.mag, e.depth, e.lat, e.lon, e.title, e.date) for e in recs}
+            base = self.base() if self.base and self.geojson and self.cluster_mode != "HeatMap" else None
+            if base and base[0] == key:
+                # Sayfa yerinde kalır: yalnızca eklenen/değişen özellikler ve silinen id'ler gider
+                old = base[1]
+                add = [e for e in recs if old.get(e.earthquake_id) != shown[e.earthquake_id]]
+                remove = [gid for gid in old if gid not in shown]
+                js = None
+                if add or remove:
+                    js = "window.quakeMap && quakeMap.update(" + json.dumps({"add": eq_geojson(add)["features"], "remove": remove},
+                                                                             ensure_ascii=False, separators=(",", ":")) + ")"
+                self.finished.emit(MapResult(key, shown, update_js=js, added=len(add), removed=len(remove)))
+                return
+
+            m = build_map(recs, self.cluster_mode, self.tiles_url, self.geojson, self.tile_cache)
+            if self.cancel.is_set(): self.cancelled.emit(); return
+            page = MAP_PAGES.put(render_map(m).encode("utf-8"))
+            self.finished.emit(MapResult(key, shown, page=page))
 
         except Exception as ex:
             self.error.emit(f"Harita oluşturma hatası: {ex}")
 
+    def _run_server_clusters(self):
+        # Kayıtlar sayfaya gömülmez: dizin eşitlenir, sayfa görünümündeki kümeleri deprem://map/clusters'tan ister.
+        # Kapsam kaynağın zaman aralığıdır (arşivde seçili gün, canlıda tüm yerel katalog); ağ kaynağı (Yenile)
+        # yalnızca DB'yi tazelemek için çalıştırılır.
+        if not HAS_NUMPY:
+            self.error.emit("Sunucu kümeleri için NumPy gerekli."); return
+        t0 = time.perf_counter()
+        if isinstance(self.source, NetworkSource): self.source.load(self.min_mag)
+        idx, changed = cluster_sync(self.min_mag, self.source.time_range)
+        logger.info(f"Küme dizini: {idx}, {(time.perf_counter() - t0) * 1000:.1f} ms")
+        if self.cancel.is_set(): self.cancelled.emit(); return
+        key = (self.cluster_mode, self.tiles_url); base = self.base() if self.base else None
+        if base and base[0] == key:
+            self.finished.emit(MapResult(key, {}, update_js="window.quakeMap && quakeMap.update({})" if changed else None)); return
+        m = build_map([], self.cluster_mode, self.tiles_url, self.geojson, self.tile_cache)
+        self.finished.emit(MapResult(key, {}, page=MAP_PAGES.put(render_map(m).encode("utf-8"))))
+
+class MapJobScheduler(QObject):
+    """MapGeneratorWorker işleri için son istek kazanır zamanlayıcısı.
+
+    submit() istekleri debounce_ms boyunca biriktirir; en fazla bir iş çalışır ve bir iş bekler (yeni
+    istek bekleyenin yerini alır). Yeni istek gelince çalışan işin iptal bayrağı kaldırılır; işçi
+    aşamalar arasında bakıp erken çıkar, eskimiş sonuçlar yayınlanmaz.
+    """
+    started = Signal()
+    finished = Signal(object)
+    error = Signal(str)
+
+    def __init__(self, debounce_ms: int = 250, parent=None):
+        super().__init__(parent)
+        self._debounce = QTimer(self); self._debounce.setSingleShot(True); self._debounce.setInterval(debounce_ms)
+        self._debounce.timeout.connect(self._launch)
+        self._pending: Optional[Dict[str, Any]] = None
+        self.thread: Optional[QThread] = None; self.worker: Optional[MapGeneratorWorker] = None
+        self._cancel: Optional[threading.Event] = None
+
+    @property
+    def busy(self) -> bool:
+        return self.thread is not None or self._pending is not None
+
+    def submit(self, params: Dict[str, Any], immediate: bool = False):
+        """params: MapGeneratorWorker argümanları. immediate=True beklemeden başlatır (ör. Yenile düğmesi)."""
+        self._pending = params
+        if self._cancel: self._cancel.set()
+        self._debounce.start(0 if immediate else self._debounce.interval())
+
+    def _launch(self):
+        if self.thread is not None or self._pending is None:
+            return  # çalışan iş bitince _on_thread_finished tekrar dener
+        params, self._pending = self._pending, None
+        self._cancel = threading.Event()
+        self.thread = QThread()
+        self.worker = MapGeneratorWorker(cancel=self._cancel, **params)
+        self.worker.moveToThread(self.thread)
+        self.thread.started.connect(self.worker.run)
+        self.worker.finished.connect(self._on_finished)
+        self.worker.error.connect(self._on_error)
+        for sig in (self.worker.finished, self.worker.error, self.worker.cancelled):
+            sig.connect(self.thread.quit)
+        self.thread.finished.connect(self._on_thread_finished)
+        self.started.emit()
+        self.thread.start()
+
+    def _stale(self) -> bool:
+        return self._cancel is None or self._cancel.is_set()
+
+    def _on_finished(self, res: MapResult):
+        if not self._stale(): self.finished.emit(res)
+        elif res.page:
+            MAP_PAGES.discard(res.page)
+
+    def _on_error(self, message: str):
+        if not self._stale(): self.error.emit(message)
+
+    def _on_thread_finished(self):
+        if self.thread:
+            self.thread.deleteLater()
+            self.thread = None
+        if self.worker:
+            self.worker.deleteLater()
+            self.worker = None
+        self._cancel = None
+        if self._pending is not None and not self._debounce.isActive():
+            self._launch()
+
+    def cancel(self):
+        self._pending = None; self._debounce.stop()
+        if self._cancel: self._cancel.set()
+
 class MapTab(QWidget):
     def __init__(self):
         super().__init__()
@@ -361,9 +2574,10 @@ class MapTab(QWidget):
         self.mode = QComboBox(); self.mode.addItems(["Canlı Veri", "Arşiv (Tarih Seç)"])
         self.date = QDateEdit(); self.date.setCalendarPopup(True); self.date.setDate(QDate.currentDate()); self.date.setVisible(False)
         self.min_mag = QDoubleSpinBox(); self.min_mag.setRange(0,10); self.min_mag.setSingleStep(0.1); self.min_mag.setValue(load_settings().get("map_min_mag",0.0))
-        self.cluster = QComboBox(); self.cluster.addItems(["Yok","MarkerCluster","HeatMap"])
-        self.tiles = QComboBox(); self.tiles.addItems(["OpenStreetMap"])
-        btn = QPushButton("Haritayı Yenile"); btn.clicked.connect(self.refresh)
+        self.cluster = QComboBox(); self.cluster.addItems(["Yok","MarkerCluster","HeatMap",SERVER_CLUSTERS])
+        self.cluster.setItemData(3, "Canlı modda tüm yerel katalog, Arşiv modunda seçili gün; kümeler Python tarafında hesaplanır", Qt.ToolTipRole)
+        self.tiles = QComboBox(); self.tiles.addItems([label for label, _, _ in TILE_SOURCES.values()])
+        btn = QPushButton("Haritayı Yenile"); btn.clicked.connect(lambda: self.refresh(immediate=True))
         ctl.addWidget(QLabel("Mod:")); ctl.addWidget(self.mode); ctl.addWidget(self.date)
         ctl.addWidget(QLabel("Min M:")); ctl.addWidget(self.min_mag); ctl.addWidget(QLabel("Küme:")); ctl.addWidget(self.cluster)
         ctl.addWidget(QLabel("Katman:")); ctl.addWidget(self.tiles); ctl.addWidget(btn); ctl.addStretch(1)
@@ -380,76 +2594,90 @@ class MapTab(QWidget):
             s.setAttribute(QWebEngineSettings.WebAttribute.JavascriptEnabled, True)
             s.setAttribute(QWebEngineSettings.WebAttribute.LocalStorageEnabled, True)
             s.setAttribute(QWebEngineSettings.WebAttribute.LocalContentCanAccessRemoteUrls, True)
+            self.view.loadFinished.connect(self._on_load_finished)
+            install_map_scheme(self.view)
             v.addWidget(self.view)
         else:
             self.view = None; v.addWidget(QLabel("QWebEngine bulunamadı. Harita devre dışı."))
         
-        self.thread = None
-        self.worker = None
+        # Yüklü kalıcı sayfa: anahtarı (küme modu, katman) ve üzerindeki olaylar; farklar buna göre gönderilir
+        self._page_key: Optional[Tuple] = None; self._page_ready = False; self._shown: Dict[str, Tuple] = {}
+        self.jobs = MapJobScheduler(parent=self)
+        self.jobs.finished.connect(self._on_map_generated)
+        self.jobs.error.connect(self._on_map_error)
 
         self.mode.currentIndexChanged.connect(self._mode_changed)
-        self.tiles.currentIndexChanged.connect(self.refresh)
-        self.min_mag.valueChanged.connect(self.refresh)
-        self.cluster.currentIndexChanged.connect(self.refresh)
-        self._last_eqs: List[Dict[str, Any]] = []
+        # Sinyal değeri immediate'e düşmesin: filtre değişiklikleri her zaman yerel veriden ve gecikmeli çizilir
+        self.tiles.currentIndexChanged.connect(lambda _: self.refresh())
+        self.min_mag.valueChanged.connect(lambda _: self.refresh())
+        self.cluster.currentIndexChanged.connect(lambda _: self.refresh())
+        self._store: Optional[EventStore] = None
 
     def _mode_changed(self, ix: int): 
         self.date.setVisible(ix==1)
         self.refresh()
 
-    def set_data(self, eqs: List[Dict[str, Any]]):
-        self._last_eqs = eqs
+    def set_data(self, store: EventStore):
+        self._store = store
         self.refresh()
     
-    def refresh(self):
-        if self.thread is not None and self.thread.isRunning():
-            return
-        
-        self.loading_label.setVisible(True)
-        if self.view:
-            self.view.setVisible(False)
-        
-        self.thread = QThread()
-        self.worker = MapGeneratorWorker(
-            mode=self.mode.currentText(),
-            date_str=self.date.date().toString("yyyy-MM-dd"),
+    def refresh(self, immediate: bool = False):
+        # Girdi değişikliklerinin hepsi buraya düşer; zamanlayıcı son parametrelerle tek üretim yapar
+        if not self._page_ready:
+            self.loading_label.setText("Harita Yükleniyor..."); self.loading_label.setVisible(True)
+            if self.view:
+                self.view.setVisible(False)
+        # Filtre değişiklikleri yerel veriden çizilir; API'ye yalnızca Yenile düğmesi (immediate) gider
+        day = None if self.mode.currentIndex() == 0 else self.date.date().toString("yyyy-MM-dd")
+        self.jobs.submit(dict(
+            source=map_source(day, self._store, refresh=immediate, settle_hours=float(load_settings().get("archive_settle_hours", 48))),
             min_mag=self.min_mag.value(),
             cluster_mode=self.cluster.currentText(),
-            tiles_url=self.tiles.currentText()
-        )
-        self.worker.moveToThread(self.thread)
-        
-        self.thread.started.connect(self.worker.run)
-        self.worker.finished.connect(self._on_map_generated)
-        self.worker.error.connect(self._on_map_error)
-        self.worker.finished.connect(self.thread.quit)
-        self.worker.error.connect(self.thread.quit)
-        
-        self.thread.finished.connect(self._on_thread_finished)
-        
-        self.thread.start()
+            tiles_url=self.tiles.currentText(),
+            geojson=bool(load_settings().get("map_geojson", True)),
+            tile_cache=bool(load_settings().get("tile_cache", True)),
+            base=self._map_base
+        ), immediate)
 
-    def _on_map_generated(self, path: str):
-        if path and self.view:
-            self.view.load(QUrl.fromLocalFile(path))
-            self.loading_label.setVisible(False)
-            self.view.setVisible(True)
-        else:
-            self.loading_label.setText("Harita yüklenemedi.")
+    def _map_base(self) -> Optional[Tuple[Tuple, Dict[str, Tuple]]]:
+        # İşçi iş parçacığından çağrılır; sayfa ve shown yalnızca iş sonuçlandığında (GUI'de) değişir
+        return (self._page_key, self._shown) if self._page_ready else None
+
+    def _on_load_finished(self, ok: bool):
+        self._page_ready = ok and self._page_key is not None
+
+    def _on_map_generated(self, res: MapResult):
+        if not self.view:
+            self.loading_label.setText("Harita yüklenemedi."); return
+        if res.page:
+            self._page_ready = False; self._page_key = res.page_key
+            self.view.load(map_page_url(res.page))
+        elif res.update_js:
+            t0 = time.perf_counter(); added, removed = res.added, res.removed
+            self.view.page().runJavaScript(res.update_js, 0, lambda n: logger.info(
+                f"Harita yerinde güncellendi: +{added} -{removed}, {n} olay, {(time.perf_counter() - t0) * 1000:.0f} ms"))
+        self._shown = res.shown
+        self.loading_label.setVisible(False)
+        self.view.setVisible(True)
         
     def _on_map_error(self, message: str):
         self.loading_label.setText(f"Harita hatası: {message}")
-        
-    def _on_thread_finished(self):
-        if self.thread:
-            self.thread.deleteLater()
-            self.thread = None
-        if self.worker:
-            self.worker.deleteLater()
-            self.worker = None
 
-    def focus_on(self, lat: float, lon: float, mag: float = 4.0, title: str = ""):
-        if not HAS_FOLIUM or not self.view: return
+    def focus_on(self, lat: float, lon: float, mag: float = 4.0, title: str = "", eq_id: Optional[str] = None):
+        """Olay yüklü sayfadaysa oraya uçup vurgular; değilse (süzülmüş, HeatMap, sayfa hazır değil) tek işaretli harita çizer."""
+        if not self.view: return
+        # Sunucu kümelerinde sayfa olay listesi tutmaz; olay odakta tekil olarak istenir
+        if eq_id and self._page_ready and (eq_id in self._shown or self._page_key[0] == SERVER_CLUSTERS):
+            t0 = time.perf_counter()
+            def done(ok):
+                if ok: logger.info(f"Harita odağı: {eq_id} ({(time.perf_counter() - t0) * 1000:.0f} ms)")
+                else: self._render_focus(lat, lon, mag, title)
+            self.view.page().runJavaScript(f"!!(window.quakeMap && window.quakeMap.focus({json.dumps(eq_id)}, 9, [{lat}, {lon}]))", 0, done)
+            return
+        self._render_focus(lat, lon, mag, title)
+
+    def _render_focus(self, lat: float, lon: float, mag: float, title: str):
+        if not HAS_FOLIUM: return
         try:
             m = folium.Map(location=[lat, lon], zoom_start=9, tiles="OpenStreetMap")
             popup_html = f"""
@@ -458,8 +2686,8 @@ class MapTab(QWidget):
             """
             popup = folium.Popup(popup_html, max_width=300)
             folium.CircleMarker([lat,lon], radius=max(6, mag*2), color=mag_to_color(mag), fill=True, popup=popup, tooltip=popup_html).add_to(m)
-            fd, path = tempfile.mkstemp(suffix=".html"); os.close(fd)
-            m.save(path); self.view.load(QUrl.fromLocalFile(path))
+            self._page_ready = False; self._page_key = None
+            self.view.load(map_page_url(MAP_PAGES.put(render_map(m).encode("utf-8"))))
         except Exception as ex:
             logger.info(f"Map focus error: {ex}")
 
@@ -487,36 +2715,50 @@ class NearTab(QWidget):
 
         row = QHBoxLayout()
         self.btn_refresh = QPushButton("Son 200 Depremi Getir"); self.btn_refresh.clicked.connect(self.refresh_data)
+        self.btn_newer = QPushButton("◀ Daha Yeni"); self.btn_newer.clicked.connect(lambda: self._show(self.pager.newer()))
+        self.btn_older = QPushButton("Daha Eski ▶"); self.btn_older.clicked.connect(lambda: self._show(self.pager.older()))
+        row.addWidget(self.btn_newer); row.addWidget(self.btn_older)
         self.btn_csv = QPushButton("CSV Dışa Aktar"); self.btn_csv.clicked.connect(self.export_csv)
         self.btn_pdf = QPushButton("PDF Dışa Aktar"); self.btn_pdf.clicked.connect(self.export_pdf)
         row.addWidget(self.btn_refresh); row.addWidget(self.btn_csv); row.addWidget(self.btn_pdf); row.addStretch(1)
         v.addLayout(row)
 
         self.deprem_table.clicked.connect(self._clicked)
-        self._last_data: List[Dict[str, Any]] = []
+        self.pager = CatalogPager(VIEW_ROWS, shape="records")
+        self._last_data: List[Earthquake] = []
 
     def _clicked(self, index):
         row = self.proxy_model.mapToSource(index).row()
         try:
             e = self._last_data[row]
-            # HATA DÜZELTİLMİŞ SATIRLAR: lon ve lat değerlerini doğrudan sözlükten alıyor
-            lon = float(e.get("lon", 0.0))
-            lat = float(e.get("lat", 0.0))
-            mag = float(e.get("mag") or 0)
-            title = e.get("title", "")
             if self.on_row_focus:
-                self.on_row_focus(lat, lon, mag, title)
+                self.on_row_focus(e.lat, e.lon, e.mag, e.title, e.earthquake_id)
         except Exception as ex:
             logger.info(f"NearTab click error: {ex}")
 
     def refresh_data(self):
-        rows = db_fetch_last(200)
+        rows = self.pager.first()
         
         if not rows:
-            eqs = fetch_live_earthquakes()
-            db_upsert_earthquakes(eqs)
-            rows = db_fetch_last(200)
-        
+            try:
+                db_upsert_earthquakes(fetch_live_earthquakes())
+                rows = self.pager.first()
+            except ApiError as ex:
+                logger.info(f"NearTab fetch error: {ex}")
+        self._show(rows)
+
+    def set_data(self, store: EventStore):
+        # İlk sayfa depodan; daha eski sayfalar pager ile DB'den. Daha eski bir sayfadaki kullanıcı yenilemede
+        # ilk sayfaya atılmaz; yeni olaylar "Daha Yeni" ile dönünce görünür.
+        if self.pager.has_newer: return
+        recs = store.records(VIEW_ROWS)
+        if not recs: return self.refresh_data()
+        self.pager.anchor((recs[0].event_ts, recs[0].earthquake_id), (recs[-1].event_ts, recs[-1].earthquake_id))
+        self._show(recs)
+
+    def _show(self, rows: List[Earthquake]):
+        self.btn_newer.setEnabled(self.pager.has_newer); self.btn_older.setEnabled(self.pager.has_older)
+        if not rows: return
         self._last_data = rows
         self.deprem_model.clear()
         
@@ -527,30 +2769,22 @@ class NearTab(QWidget):
         ]
         self.deprem_model.setHorizontalHeaderLabels(headers)
 
+        airports_by_id = db_fetch_airports([e.earthquake_id for e in rows])
         for e in rows:
-            lp = e.get("location_properties", {}) or {}
-            cc = lp.get("closestCity", {}) or {}
-            airports = e.get("airports_json", "[]") 
-            airports = json.loads(airports) if airports else []
-
-            airports_names = "\n".join([a.get("name","") for a in airports]) if airports else "-"
-            dists = []
-            for a in airports:
-                try: dkm = int(float(a.get("distance",0))/1000)
-                except: dkm = 0
-                dists.append(str(dkm))
-            airports_dists = "\n".join(dists) if dists else "-"
+            airports = airports_by_id.get(e.earthquake_id, [])
+            airports_names = "\n".join(n for n, _ in airports) if airports else "-"
+            airports_dists = "\n".join(str(int(d)) for _, d in airports) if airports else "-"
 
             row_items = [
-                QStandardItem(str(e.get("date",""))),
-                QStandardItem(str(e.get("title",""))),
-                QStandardItem(f"{float(e.get('mag') or 0):.1f}"),
-                QStandardItem(f"{float(e.get('depth') or 0):.1f}"),
-                QStandardItem(str(cc.get("name",""))),
-                QStandardItem(str(cc.get("cityCode",""))),
-                QStandardItem(f"{float(cc.get('distance',0)/1000):.1f}"),
-                QStandardItem(str(cc.get("population",""))),
-                QStandardItem((lp.get("epiCenter", {}) or {}).get("name","")),
+                QStandardItem(e.date),
+                QStandardItem(e.title),
+                QStandardItem(f"{e.mag:.1f}"),
+                QStandardItem(f"{e.depth:.1f}"),
+                QStandardItem(e.city_name or ""),
+                QStandardItem("" if e.city_code is None else str(e.city_code)),
+                QStandardItem(f"{(e.city_distance or 0)/1000:.1f}"),
+                QStandardItem("" if e.city_population is None else str(e.city_population)),
+                QStandardItem(e.epicenter or ""),
                 QStandardItem(airports_names),
                 QStandardItem(airports_dists)
             ]
@@ -627,29 +2861,29 @@ class AnalysisTab(QWidget):
             self.fig, self.canvas = None, None
             v.addWidget(QLabel("Matplotlib bulunamadı. Grafik devre dışı."))
 
-        self._data: List[Dict[str, Any]] = []
+        self._store: Optional[EventStore] = None
         if HAS_MATPLOTLIB: self.combo.currentIndexChanged.connect(self._replot)
         self.premium_options = ["Deprem Tahmin Trendleri", "1 Haftalık Geçmiş"]
         
-    def set_data(self, eqs: List[Dict[str, Any]]): self._data = eqs; self._replot()
+    def set_data(self, store: EventStore): self._store = store; self._replot()
     
     def _replot(self):
         if not HAS_MATPLOTLIB or not self.fig: return
         self.fig.clear(); ax = self.fig.add_subplot(111)
-        eqs = self._data
-        if not eqs: ax.text(0.5,0.5,"Veri yok", ha="center"); self.canvas.draw_idle(); return
+        st = self._store
+        if st is None or not len(st): ax.text(0.5,0.5,"Veri yok", ha="center"); self.canvas.draw_idle(); return
         try:
             if self.combo.currentText() == "Büyüklük - Zaman":
-                xs = [int(e.get("created_at") or 0) for e in eqs]; ys = [float(e.get("mag") or 0) for e in eqs]; ax.plot(xs,ys,marker="o",linestyle="-"); ax.set_xlabel("Zaman (Unix)"); ax.set_ylabel("M")
+                ax.plot(np.asarray(st.col("event_ts", VIEW_ROWS)), np.asarray(st.col("mag", VIEW_ROWS)), marker="o", linestyle="-"); ax.set_xlabel("Zaman (Unix)"); ax.set_ylabel("M")
             elif self.combo.currentText() == "Büyüklük Dağılımı":
-                mags=[float(e.get("mag") or 0) for e in eqs]; ax.hist(mags,bins=20); ax.set_xlabel("M"); ax.set_ylabel("Frekans")
+                ax.hist(np.asarray(st.col("mag", VIEW_ROWS)), bins=20); ax.set_xlabel("M"); ax.set_ylabel("Frekans")
             elif self.combo.currentText() == "Derinlik Dağılımı":
-                depths=[float(e.get("depth") or 0) for e in eqs]; ax.hist(depths,bins=20); ax.set_xlabel("Derinlik (km)"); ax.set_ylabel("Frekans")
+                ax.hist(np.asarray(st.col("depth", VIEW_ROWS)), bins=20); ax.set_xlabel("Derinlik (km)"); ax.set_ylabel("Frekans")
             elif self.combo.currentText() == "Günlük Ortalama Büyüklük":
-                from collections import defaultdict; buckets=defaultdict(list); import datetime as _dt
-                for e in eqs:
-                    ts = int(e.get("created_at") or 0); day = _dt.datetime.fromtimestamp(ts).strftime("%Y-%m-%d"); buckets[day].append(float(e.get("mag") or 0))
-                days = sorted(buckets.keys()); avgs = [sum(buckets[d])/len(buckets[d]) for d in days]; ax.plot(days,avgs,marker="o"); ax.set_xlabel("Gün"); ax.set_ylabel("Ortalama M"); ax.tick_params(axis='x', rotation=45)
+                tss = st.col("event_ts", VIEW_ROWS)
+                stats = db_bucket_stats(86400, (tss[-1], tss[0]))
+                days = [time.strftime("%Y-%m-%d", time.gmtime(b + TR_UTC_OFFSET)) for b, _, _, _ in stats]; avgs = [a for _, _, a, _ in stats]
+                ax.plot(days,avgs,marker="o"); ax.set_xlabel("Gün"); ax.set_ylabel("Ortalama M"); ax.tick_params(axis='x', rotation=45)
         except Exception as ex:
             logger.info(f"Plot error: {ex}"); ax.text(0.5,0.5,"Grafik hatası", ha="center")
         self.canvas.draw_idle()
@@ -685,9 +2919,13 @@ class MainWindow(QMainWindow):
         self.setWindowIcon(QIcon.fromTheme("applications-system"))
         self.settings = load_settings()
         db_init()
+        EVENT_STORE.capacity = max(VIEW_ROWS, int(self.settings.get("event_store_capacity", 1000)))
+        MAP_PAGES.max_bytes = int(float(self.settings.get("map_cache_mb", 64)) * (1 << 20))
+        if not self.settings.get("map_cache_spill", True): MAP_PAGES.spill_dir = None
+        EVENT_STORE.load(); self._rendered_version = -1
         splitter = QSplitter(); left = QWidget(); left_v = QVBoxLayout(left); self.tabs = QTabWidget(); left_v.addWidget(self.tabs); splitter.addWidget(left)
-        right = QWidget(); right_v = QVBoxLayout(right); self.lbl_quick = QLabel("<b>Hızlı İstatistik</b><br>—"); self.btn_refresh_all = QPushButton("Tümünü Yenile"); self.btn_refresh_all.clicked.connect(self.refresh_all)
-        right_v.addWidget(self.lbl_quick); right_v.addWidget(self.btn_refresh_all); right_v.addStretch(1); splitter.addWidget(right); splitter.setSizes([1100,300]); self.setCentralWidget(splitter)
+        right = QWidget(); right_v = QVBoxLayout(right); self.lbl_quick = QLabel("<b>Hızlı İstatistik</b><br>—"); self.lbl_poll = QLabel("Yoklama: —"); self.btn_refresh_all = QPushButton("Tümünü Yenile"); self.btn_refresh_all.clicked.connect(self.refresh_all)
+        right_v.addWidget(self.lbl_quick); right_v.addWidget(self.lbl_poll); right_v.addWidget(self.btn_refresh_all); right_v.addStretch(1); splitter.addWidget(right); splitter.setSizes([1100,300]); self.setCentralWidget(splitter)
         
         self.home_tab = HomeTab()
         self.map_tab = MapTab()
@@ -708,7 +2946,10 @@ class MainWindow(QMainWindow):
         self._setup_menu()
         self.tray = QSystemTrayIcon(QIcon.fromTheme("dialog-information"), self); tray_menu = QMenu(); act_show = QAction("Göster", self); act_show.triggered.connect(lambda: (self.showNormal(), self.raise_())); act_quit = QAction("Çıkış", self); act_quit.triggered.connect(self.close); tray_menu.addAction(act_show); tray_menu.addAction(act_quit); self.tray.setContextMenu(tray_menu); self.tray.show()
         self.apply_theme(self.settings.get("theme","dark"))
-        self.timer = QTimer(self); self.timer.timeout.connect(self.refresh_all); self.timer.setInterval(max(1,int(self.settings.get("auto_refresh_minutes",5)))*60*1000)
+        # Tek atımlık zamanlayıcı: her yoklamadan sonra PollScheduler'ın gecikmesiyle yeniden kurulur
+        self.scheduler = PollScheduler.from_settings(self.settings)
+        self.timer = QTimer(self); self.timer.setSingleShot(True); self.timer.timeout.connect(self.refresh_all)
+        self.pipeline = RefreshPipeline(self); self.pipeline.diffReady.connect(self._on_diff)
         
         self.refresh_all()
 
@@ -716,10 +2957,11 @@ class MainWindow(QMainWindow):
         menubar = self.menuBar(); m_file = menubar.addMenu("&Dosya"); act_refresh = QAction("Yenile", self); act_refresh.triggered.connect(self.refresh_all); act_exit = QAction("Çıkış", self); act_exit.triggered.connect(self.close); m_file.addAction(act_refresh); m_file.addSeparator(); m_file.addAction(act_exit)
         m_view = menubar.addMenu("&Görünüm"); act_dark = QAction("Koyu Tema", self); act_dark.triggered.connect(lambda: self.apply_theme("dark")); act_light = QAction("Açık Tema", self); act_light.triggered.connect(lambda: self.apply_theme("light")); m_view.addAction(act_dark); m_view.addAction(act_light)
     
-    def show_map_with_focus(self, lat: float, lon: float, mag: float, title: str):
+    def show_map_with_focus(self, lat: float, lon: float, mag: float, title: str, eq_id: Optional[str] = None):
         """Harita sekmesini açar ve haritayı belirtilen konuma odaklama işlemi yapar."""
-        self.map_tab.focus_on(lat, lon, mag, title)
+        # Önce sekme açılır: uçuş görünür haritada başlasın
         self.tabs.setCurrentWidget(self.map_tab)
+        self.map_tab.focus_on(lat, lon, mag, title, eq_id)
         
     def apply_theme(self, theme: str):
         if theme == "light": self.setStyleSheet("")
@@ -727,36 +2969,404 @@ class MainWindow(QMainWindow):
             self.setStyleSheet("QWidget{background:#2b2b2b;color:#e6e6e6;} QLineEdit, QPlainTextEdit, QComboBox, QSpinBox, QDoubleSpinBox, QDateEdit, QTableWidget{background:#3c3f41;color:#fff;} QPushButton{background:#3c3f41;color:#fff;padding:6px;border:1px solid #555;}")
         self.settings["theme"] = theme; save_settings(self.settings)
 
+    def closeEvent(self, ev):
+        self.timer.stop(); self.pipeline.shutdown()
+        super().closeEvent(ev)
+
+    def _render_store(self):
+        st = EVENT_STORE; self._rendered_version = st.version
+        self.home_tab.update_overview(st)
+        self.map_tab.set_data(st)
+        self.near_tab.set_data(st)
+        self.analysis_tab.set_data(st)
+        mags = st.col("mag", VIEW_ROWS); txt = f"Son {len(mags)} deprem | Ortalama M: {(sum(mags)/len(mags)):.2f}" if len(mags) else "—"
+        self.lbl_quick.setText(f"<b>Hızlı İstatistik</b><br>{txt}")
+
     def refresh_all(self):
+        daemon = read_daemon_status()
+        if daemon:
+            self._consume(daemon); return
+        if not self.pipeline.request():
+            self.logs_tab.append("Yenileme sürüyor; bitince bir tur daha yapılacak")
+
+    def _on_diff(self, diff: RefreshDiff):
         try:
-            live = fetch_live_earthquakes()
-            if live:
-                db_upsert_earthquakes(live)
+            if diff.error:
+                self.logs_tab.append(diff.error)
+            else:
+                self.logs_tab.append(f"Canlı veri: {len(diff.inserted_ids)} yeni, {len(diff.updated_ids)} güncellenen, {diff.unchanged} değişmeyen")
                 try: th = float(self.settings.get("mag_threshold_for_notification",5.5))
                 except: th = 5.5
-                top = live[0]
-                if float(top.get("mag") or 0) >= th: 
-                    self.tray.showMessage("Yeni Deprem", f"M{float(top.get('mag') or 0):.1f} — {top.get('title','')}", QSystemTrayIcon.Information)
-            
-            rows = db_fetch_last(200)
-            
-            self.home_tab.update_overview(rows)
-            self.map_tab.set_data(rows)
-            self.near_tab.refresh_data()
-            self.analysis_tab.set_data(rows)
-            
-            mags = [float(e.get("mag") or 0) for e in rows]; txt = f"Son {len(rows)} deprem | Ortalama M: {(sum(mags)/len(mags)):.2f}" if mags else "—"
-            self.lbl_quick.setText(f"<b>Hızlı İstatistik</b><br>{txt}")
-            self.logs_tab.append(f"Yenilendi: {len(rows)} kayıt")
-            
+                top = diff.top
+                if top and top.earthquake_id in diff.inserted_ids and (top.mag or 0) >= th:
+                    self.tray.showMessage("Yeni Deprem", f"M{top.mag:.1f} — {top.title or ''}", QSystemTrayIcon.Information)
+            # Diğer yazanların (ör. harita işçisi) bekleyen değişiklikleri de alınır
+            changed = EVENT_STORE.apply(diff.rows); changed = EVENT_STORE.sync() or changed
+            if changed or EVENT_STORE.version != self._rendered_version:
+                self._render_store()
+            self.logs_tab.append(f"Yenilendi: {len(EVENT_STORE)} kayıt (sürüm {EVENT_STORE.version})")
         except Exception as ex:
             logger.info(f"refresh_all error: {ex}"); self.logs_tab.append(f"Hata: {ex}")
+        finally:
+            self._schedule_poll(diff.ok)
+
+    def _consume(self, daemon: Dict[str, Any]):
+        # Daemon veriyi topluyor: API'ye gidilmez, yalnızca başka bağlantıların yazdıkları izlenir
+        try:
+            top = EVENT_STORE.col("earthquake_id", 1)
+            if EVENT_STORE.poll_external():
+                self._render_store()
+                mags = EVENT_STORE.col("mag", 1); ids = EVENT_STORE.col("earthquake_id", 1)
+                try: th = float(self.settings.get("mag_threshold_for_notification",5.5))
+                except: th = 5.5
+                if ids and ids != top and mags[0] >= th:
+                    self.tray.showMessage("Yeni Deprem", f"M{mags[0]:.1f} — {EVENT_STORE.col('title', 1)[0]}", QSystemTrayIcon.Information)
+                self.logs_tab.append(f"Daemon verisi: {len(EVENT_STORE)} kayıt (sürüm {EVENT_STORE.version})")
+        except Exception as ex:
+            logger.info(f"consume error: {ex}"); self.logs_tab.append(f"Hata: {ex}")
+        live = daemon.get("live", {}); nxt = live.get("next_at")
+        nxt = time.strftime("%H:%M:%S", time.localtime(nxt)) if nxt else "—"
+        self.lbl_poll.setText(f"Servis ({daemon.get('health')}): {live.get('interval') or '—'} sn ({live.get('reason') or '—'}) | sonraki {nxt}")
+        self.timer.start(CONSUMER_POLL_MS)
+
+    def _schedule_poll(self, ok: bool):
+        sc = self.scheduler
+        delay = sc.success(EVENT_STORE.col("event_ts"), EVENT_STORE.col("mag")) if ok else sc.failure()
+        self.timer.start(int(delay * 1000))
+        msg = sc.describe(); self.lbl_poll.setText(msg); logger.info(msg); self.logs_tab.append(msg)
+
+# ------------------------
+# Benchmark
+# ------------------------
+def synthetic_earthquakes(n: int, seed: int = 1, start: int = 0) -> List[Dict[str, Any]]:
+    import random
+    rnd = random.Random(seed + start); t0 = 1_675_000_000; out = []
+    for i in range(start, start + n):
+        ts = t0 + i * 37
+        out.append({
+            "earthquake_id": f"syn{i:08d}", "provider": "kandilli", "title": f"SENTETIK-{i % 81} ({rnd.choice(['MALATYA','HATAY','IZMIR','VAN'])})",
+            "date": time.strftime("%Y.%m.%d %H:%M:%S", time.gmtime(ts + 3*3600)), "mag": round(rnd.uniform(1.0, 7.5), 1), "depth": round(rnd.uniform(1, 30), 1),
+            "geojson": {"type": "Point", "coordinates": [round(rnd.uniform(26, 45), 4), round(rnd.uniform(36, 42), 4)]}, "created_at": ts,
+            "location_properties": {"closestCity": {"name": "Malatya", "cityCode": 44, "distance": rnd.uniform(1000, 90000), "population": 812580},
+                                    "epiCenter": {"name": "Malatya"}, "airports": [{"name": "Malatya Havalimanı", "code": "MLX", "distance": rnd.uniform(1000, 90000)}]},
+        })
+    return out
+
+def _bench_legacy_upsert(items: List[Dict[str, Any]]):
+    # Temel sürümdeki yolun kopyası: çağrı başına yeni bağlantı, kayıt başına sözlük kazıma + json.dumps + execute
+    con = sqlite3.connect(DB_PATH)
+    cur = con.cursor()
+    for e in items:
+        try:
+            gid = e.get("earthquake_id") or ""
+            prov = e.get("provider") or ""
+            title = e.get("title") or ""
+            date = e.get("date") or e.get("date_time") or ""
+            mag = float(e.get("mag") or 0)
+            depth = float(e.get("depth") or 0)
+            geo = e.get("geojson", {}).get("coordinates", [0,0])
+            lon = float(geo[0]) if len(geo)>0 else 0.0
+            lat = float(geo[1]) if len(geo)>1 else 0.0
+            created_at = int(e.get("created_at") or int(time.time()))
+            lp = e.get("location_properties", {}) or {}
+            cc = lp.get("closestCity", {}) or {}
+            cc_name = cc.get("name")
+            cc_code = cc.get("cityCode")
+            cc_dist = cc.get("distance")
+            cc_pop = cc.get("population")
+            epi = lp.get("epiCenter", {}) or {}
+            epi_name = epi.get("name")
+            airports = lp.get("airports", []) or []
+            airports_json = json.dumps(airports, ensure_ascii=False)
+            cur.execute("""
+                INSERT INTO earthquakes
+                (earthquake_id, provider, title, date, mag, depth, lon, lat, created_at,
+                 closestCity_name, closestCity_code, closestCity_distance, closestCity_population,
+                 epiCenter_name, airports_json)
+                VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+                ON CONFLICT(earthquake_id) DO UPDATE SET
+                  provider=excluded.provider,
+                  title=excluded.title,
+                  date=excluded.date,
+                  mag=excluded.mag,
+                  depth=excluded.depth,
+                  lon=excluded.lon,
+                  lat=excluded.lat,
+                  created_at=excluded.created_at,
+                  closestCity_name=excluded.closestCity_name,
+                  closestCity_code=excluded.closestCity_code,
+                  closestCity_distance=excluded.closestCity_distance,
+                  closestCity_population=excluded.closestCity_population,
+                  epiCenter_name=excluded.epiCenter_name,
+                  airports_json=excluded.airports_json
+            """, (gid, prov, title, date, mag, depth, lon, lat, created_at,
+                  cc_name, cc_code, cc_dist, cc_pop, epi_name, airports_json))
+        except Exception as ex:
+            logger.info(f"DB upsert error: {ex}")
+    con.commit(); con.close()
+
+def bench_upsert(n: int = 100_000, chunk: int = 500) -> Dict[str, float]:
+    """Eski ve toplu upsert yolunu geçici veritabanlarında karşılaştırır (chunk: çağrı başına kayıt)."""
+    global DB_PATH
+    items = synthetic_earthquakes(n); saved = DB_PATH; res = {}
+    with tempfile.TemporaryDirectory() as td:
+        try:
+            for name, fn in (("legacy", _bench_legacy_upsert), ("bulk", db_upsert_earthquakes)):
+                DB_PATH = os.path.join(td, f"{name}.db")
+                # İki yol da güncel şemaya yazar (indeksler, R-tree tetikleyicileri); fark yalnızca yazma yolundandır
+                db_init()
+                # İkinci geçiş aynı veriyi yeniden yazar (canlı akış yenilemesi): toplu yol değişmeyenleri atlar
+                for key in (name, f"{name}_unchanged"):
+                    t0 = time.perf_counter()
+                    for i in range(0, n, chunk):
+                        fn(items[i:i+chunk])
+                    res[key] = time.perf_counter() - t0
+        finally:
+            DB_PATH = saved
+    res["speedup"] = res["legacy"] / res["bulk"] if res["bulk"] else 0.0
+    res["speedup_unchanged"] = res["legacy_unchanged"] / res["bulk_unchanged"] if res["bulk_unchanged"] else 0.0
+    print(f"upsert {n} kayıt (çağrı başına {chunk}): eski {res['legacy']:.2f} sn, toplu {res['bulk']:.2f} sn, hızlanma x{res['speedup']:.1f}; "
+          f"değişmeyen tekrar: eski {res['legacy_unchanged']:.2f} sn, toplu {res['bulk_unchanged']:.2f} sn, hızlanma x{res['speedup_unchanged']:.1f}")
+    return res
+
+def _bench_fill(con: sqlite3.Connection, n: int):
+    # Büyük tablolar için satırları doğrudan SQLite içinde üretir
+    con.execute("BEGIN")
+    con.execute("""
+        WITH RECURSIVE c(i) AS (SELECT 0 UNION ALL SELECT i+1 FROM c WHERE i+1 < ?)
+        INSERT INTO earthquakes(earthquake_id, provider, title, date, mag, depth, lon, lat, created_at,
+                                closestCity_name, closestCity_code, epiCenter_name, airports_json)
+        SELECT printf('syn%09d', i), 'kandilli', 'SENTETIK',
+               strftime('%Y.%m.%d %H:%M:%S', 1000000000 + i*30 + abs(random() % 30), 'unixepoch'),
+               round(1 + abs(random() % 650) / 100.0, 1), abs(random() % 300) / 10.0,
+               26 + abs(random() % 19000) / 1000.0, 36 + abs(random() % 6000) / 1000.0,
+               1000000000 + i*30 + abs(random() % 30), 'Şehir', 1 + abs(random() % 81), 'Şehir', '[]'
+        FROM c
+    """, (n,))
+    con.execute("COMMIT")
+
+BENCH_INDEX_QUERIES = {
+    "son_200": ("SELECT * FROM earthquakes ORDER BY created_at DESC LIMIT 200", ()),
+    "mag>=6": ("SELECT * FROM earthquakes WHERE mag >= 6 ORDER BY mag DESC LIMIT 200", ()),
+    "tarih_araligi": ("SELECT count(*), avg(mag) FROM earthquakes WHERE date BETWEEN ? AND ?", ("2001.09.09 00:00:00", "2001.09.10 00:00:00")),
+    "sehir": ("SELECT * FROM earthquakes WHERE closestCity_code = ? LIMIT 200", (44,)),
+}
+
+def bench_indexes(sizes: List[int], repeat: int = 5) -> Dict[int, Dict[str, Tuple[float, float]]]:
+    """Göç öncesi/sonrası sorgu gecikmesi (ms) — her boyut için ayrı geçici veritabanı."""
+    global DB_PATH
+    saved = DB_PATH; out = {}
+    with tempfile.TemporaryDirectory() as td:
+        try:
+            for n in sizes:
+                DB_PATH = os.path.join(td, f"idx{n}.db"); con = db_connect()
+                db_migrate(con, DB_MIGRATIONS.index(_mig_indexes)); _bench_fill(con, n)
+                def timed():
+                    res = {}
+                    for name, (sql, params) in BENCH_INDEX_QUERIES.items():
+                        best = float("inf")
+                        for _ in range(repeat):
+                            t0 = time.perf_counter(); con.execute(sql, params).fetchall(); best = min(best, time.perf_counter() - t0)
+                        res[name] = best * 1000
+                    return res
+                before = timed(); db_migrate(con); after = timed()
+                out[n] = {k: (before[k], after[k]) for k in before}
+                for k, (b, a) in out[n].items():
+                    print(f"{n:>10} satır  {k:<14} önce {b:9.2f} ms  sonra {a:9.2f} ms")
+                con.close(); _DB_LOCAL.cons.pop(DB_PATH, None)
+        finally:
+            DB_PATH = saved
+    return out
+
+def bench_records(n: int = 1_000_000) -> Dict[str, float]:
+    """DB satırlarından sözlük ve Earthquake kaydı: bellek ve harita döngüsü süresi."""
+    import tracemalloc, gc
+    global DB_PATH
+    saved = DB_PATH; res: Dict[str, float] = {}
+    with tempfile.TemporaryDirectory() as td:
+        try:
+            DB_PATH = os.path.join(td, "rec.db"); con = db_connect(); db_init(); _bench_fill(con, n)
+            sql = f"SELECT {', '.join(RECORD_COLUMNS)} FROM earthquakes"
+            builders = (("dict", lambda r: dict(zip(RECORD_COLUMNS, r))), ("record", Earthquake.from_row))
+            loops = {
+                # Eski harita döngüsünün alan erişimleri
+                "dict": lambda xs: [(float(e.get("lat") or 0), float(e.get("lon") or 0), mag_to_color(float(e.get("mag") or 0)),
+                                     max(4, float(e.get("mag") or 0)*1.5), f"{float(e.get('mag') or 0):.1f}{e.get('title','')}{e.get('date','')}{float(e.get('depth') or 0):.1f}")
+                                    for e in xs if float(e.get("mag") or 0) >= 3.0],
+                "record": lambda xs: [(e.lat, e.lon, mag_to_color(e.mag), max(4, e.mag*1.5), f"{e.mag:.1f}{e.title}{e.date}{e.depth:.1f}")
+                                      for e in xs if e.mag >= 3.0],
+            }
+            for name, build in builders:
+                gc.collect(); tracemalloc.start()
+                t0 = time.perf_counter(); xs = [build(r) for r in con.execute(sql)]; res[f"{name}_build_s"] = time.perf_counter() - t0
+                res[f"{name}_mb"] = tracemalloc.get_traced_memory()[0] / 1e6; tracemalloc.stop()
+                t0 = time.perf_counter(); loops[name](xs); res[f"{name}_loop_s"] = time.perf_counter() - t0
+                del xs
+                print(f"{name:>6}: {res[f'{name}_mb']:8.1f} MB, oluşturma {res[f'{name}_build_s']:.2f} sn, harita döngüsü {res[f'{name}_loop_s']:.2f} sn ({n} kayıt)")
+            con.close(); _DB_LOCAL.cons.pop(DB_PATH, None)
+        finally:
+            DB_PATH = saved
+    return res
+
+def bench_map(sizes: List[int]) -> Dict[int, Dict[str, Tuple[int, float, Optional[float]]]]:
+    """Olay başına folium işaretleri ile tek GeoJSON katmanı: sayfa boyutu, üretim ve (QWebEngine varsa) yükleme süresi."""
+    import gc
+    app = (QApplication.instance() or QApplication(sys.argv[:1])) if HAS_WEBENGINE else None
+    def page_load(path: str) -> Optional[float]:
+        if app is None: return None
+        from PySide6.QtCore import QEventLoop
+        view = QWebEngineView(); loop = QEventLoop(); res: Dict[str, float] = {}
+        def done(ok: bool):
+            if ok: res["t"] = time.perf_counter() - t0
+            loop.quit()
+        view.loadFinished.connect(done); QTimer.singleShot(600_000, loop.quit)
+        t0 = time.perf_counter(); view.load(QUrl.fromLocalFile(path)); loop.exec()
+        view.deleteLater(); return res.get("t")
+    out: Dict[int, Dict[str, Tuple[int, float, Optional[float]]]] = {}
+    with tempfile.TemporaryDirectory() as td:
+        for n in sizes:
+            now = int(time.time()); recs = [Earthquake.from_api(e, now) for e in synthetic_earthquakes(n)]; out[n] = {}
+            for name, geojson in (("folium", False), ("geojson", True)):
+                path = os.path.join(td, f"{name}_{n}.html"); gc.collect()
+                t0 = time.perf_counter()
+                with open(path, "w", encoding="utf-8") as f: f.write(render_map(build_map(recs, "Yok", geojson=geojson)))
+                gen = time.perf_counter() - t0
+                size = os.path.getsize(path); load = page_load(path); os.remove(path)
+                out[n][name] = (size, gen, load)
+                load_txt = f"{load:.2f} sn" if load is not None else "— (QWebEngine yok)"
+                print(f"{n:>7} {name:>7}: sayfa {size / 1e6:8.2f} MB, üretim {gen:7.2f} sn, yükleme {load_txt}", flush=True)
+    return out
+
+def bench_clusters(sizes: List[int], add: int = 1000, repeat: int = 5) -> Dict[int, Dict[str, float]]:
+    """ClusterIndex: baştan kurulum, add olayın artımlı eklenmesi ve farklı zoomlarda görünüm sorgusu (Türkiye)."""
+    global DB_PATH, _CLUSTER_INDEX
+    saved = DB_PATH; out: Dict[int, Dict[str, float]] = {}
+    views = {5: (22.0, 33.0, 48.0, 44.0), 8: (34.0, 37.0, 38.0, 39.5), 12: (38.2, 38.3, 38.45, 38.45), 17: (38.30, 38.35, 38.32, 38.36)}
+    with tempfile.TemporaryDirectory() as td:
+        try:
+            for n in sizes:
+                DB_PATH = os.path.join(td, f"cl{n}.db"); con = db_connect(); db_init(); _bench_fill(con, n)
+                res = out[n] = {}
+                t0 = time.perf_counter(); idx, _ = cluster_sync(0.0); res["build_s"] = time.perf_counter() - t0
+                db_upsert_earthquakes(synthetic_earthquakes(add, start=n)); size = idx.size
+                t0 = time.perf_counter(); cluster_sync(0.0); res["add_ms"] = (time.perf_counter() - t0) * 1000
+                res["added"] = idx.size - size
+                line = f"{n:>9} olay: kurulum {res['build_s']:6.2f} sn, +{res['added']} olay {res['add_ms']:7.1f} ms"
+                for z, bbox in views.items():
+                    best = float("inf")
+                    for _ in range(repeat):
+                        t0 = time.perf_counter(); body = cluster_response(f"z={z}&bbox={','.join(map(str, bbox))}")[0]
+                        best = min(best, time.perf_counter() - t0)
+                    feats = json.loads(body)["features"]
+                    res[f"z{z}_ms"] = best * 1000; res[f"z{z}_features"] = len(feats)
+                    line += f" | z{z}: {len(feats)} öğe, {len(body) / 1e3:.0f} KB, {best * 1000:.1f} ms"
+                print(line, flush=True)
+                con.close(); _DB_LOCAL.cons.pop(DB_PATH, None)
+        finally:
+            DB_PATH = saved; _CLUSTER_INDEX = None
+    return out
+
+def _bench_stream_child(mode: str, url: str):
+    import resource
+    rss = lambda: resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux: KB
+    before = rss(); t0 = time.perf_counter(); first = None; n = 0; now = int(time.time())
+    if mode == "full":
+        items = api_get(url); first = time.perf_counter() - t0
+        for e in items: Earthquake.from_api(e, now); n += 1
+    else:
+        for batch in API_CLIENT.stream_result(url, batch_size=500):
+            if first is None: first = time.perf_counter() - t0
+            for e in batch: Earthquake.from_api(e, now); n += 1
+    print(json.dumps({"rows": n, "first_row_s": first, "total_s": time.perf_counter() - t0, "rss_before_mb": before, "rss_peak_mb": rss()}))
+
+def bench_stream(n: int = 200_000) -> Dict[str, Dict[str, float]]:
+    """Tüm gövdeyi çözme ile akışlı çözmeyi ayrı süreçlerde karşılaştırır: tepe RSS ve ilk satıra kadar geçen süre."""
+    import subprocess, socket
+    out = {}
+    with tempfile.TemporaryDirectory() as td:
+        with open(os.path.join(td, "archive.json"), "w", encoding="utf-8") as f:
+            # Parça parça üretilir: çocuk süreçler ebeveynin RSS tepe değerini devralır (Linux ru_maxrss)
+            f.write('{"status": true, "httpStatus": 200, "result": [')
+            for k in range(0, n, 10_000):
+                f.write(("," if k else "") + ",".join(json.dumps(e, ensure_ascii=False) for e in synthetic_earthquakes(min(10_000, n - k), start=k)))
+            f.write("]}")
+        with socket.socket() as sk:
+            sk.bind(("127.0.0.1", 0)); port = sk.getsockname()[1]
+        srv = subprocess.Popen([sys.executable, "-m", "http.server", str(port), "--bind", "127.0.0.1", "--directory", td],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            for _ in range(100):
+                try:
+                    socket.create_connection(("127.0.0.1", port), timeout=0.1).close(); break
+                except OSError:
+                    time.sleep(0.05)
+            url = f"http://127.0.0.1:{port}/archive.json"
+            for mode in ("full", "stream"):
+                r = subprocess.run([sys.executable, os.path.abspath(__file__), "bench", "stream", "--child", mode, "--url", url],
+                                   capture_output=True, text=True, check=True)
+                res = out[mode] = json.loads(r.stdout.strip().splitlines()[-1])
+                print(f"{mode:>6}: {res['rows']} kayıt, ilk satır {res['first_row_s']*1000:8.1f} ms, toplam {res['total_s']:.2f} sn, "
+                      f"tepe RSS {res['rss_peak_mb']:.0f} MB (başlangıç {res['rss_before_mb']:.0f} MB)")
+        finally:
+            srv.terminate(); srv.wait()
+    return out
 
 # ------------------------
 # Entry
 # ------------------------
-def main():
-    app = QApplication(sys.argv)
+def build_arg_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="deprem.py", description="Deprem Gözlem")
+    sub = ap.add_subparsers(dest="cmd")
+    b = sub.add_parser("bench", help="Performans ölçümleri")
+    b.add_argument("name", choices=["upsert", "indexes", "records", "stream", "map", "clusters"])
+    b.add_argument("-n", type=int, default=None, help="kayıt sayısı (varsayılan: ölçüme göre)")
+    b.add_argument("--chunk", type=int, default=500)
+    b.add_argument("--sizes", default=None, help="indexes / map / clusters için virgülle ayrılmış boyutlar")
+    b.add_argument("--child", choices=["full", "stream"], help=argparse.SUPPRESS)
+    b.add_argument("--url", help=argparse.SUPPRESS)
+    bf = sub.add_parser("backfill", help="Tarih aralığındaki arşivi yerel veritabanına doldurur")
+    bf.add_argument("--from", dest="date_from", required=True, help="YYYY-MM-DD")
+    bf.add_argument("--to", dest="date_to", required=True, help="YYYY-MM-DD")
+    bf.add_argument("--workers", type=int, default=4)
+    bf.add_argument("--force", action="store_true", help="tamamlanmış günleri de yeniden çek")
+    tl = sub.add_parser("tiles", help="Karo önbelleği: Türkiye için önceden indirme ve istatistik")
+    tl.add_argument("action", choices=["prefetch", "stats"])
+    tl.add_argument("--layer", choices=list(TILE_SOURCES), default="osm")
+    tl.add_argument("--zmin", type=int, default=5)
+    tl.add_argument("--zmax", type=int, default=10)
+    tl.add_argument("--workers", type=int, default=2)
+    av = sub.add_parser("assets", help="Harita JS/CSS varlıklarını çevrimdışı kullanım için indirir")
+    av.add_argument("--check", action="store_true", help="indirmeden, sayfada uzak varlık kalıp kalmadığını denetle")
+    av.add_argument("--force", action="store_true", help="var olanları da yeniden indir")
+    dm = sub.add_parser("daemon", help="Arayüzsüz veri toplayıcı (canlı yoklama + arşiv doldurma)")
+    dm.add_argument("--backfill-days", type=int, default=7, help="doldurulacak son gün sayısı (0: kapalı)")
+    dm.add_argument("--backfill-hours", type=float, default=6, help="doldurma tekrar aralığı (saat)")
+    dm.add_argument("--workers", type=int, default=2)
+    dm.add_argument("--once", action="store_true", help="bir tur çalışıp çık")
+    return ap
+
+def main(argv: Optional[List[str]] = None):
+    args = build_arg_parser().parse_args(argv)
+    if args.cmd == "bench":
+        if args.name == "upsert": bench_upsert(args.n or 100_000, args.chunk)
+        elif args.name == "indexes": bench_indexes([int(x) for x in (args.sizes or "10000,1000000,10000000").split(",")])
+        elif args.name == "map": bench_map([int(x) for x in (args.sizes or "1000,10000,100000").split(",")])
+        elif args.name == "clusters": bench_clusters([int(x) for x in (args.sizes or "10000,100000,1000000").split(",")])
+        elif args.name == "records": bench_records(args.n or 1_000_000)
+        elif args.name == "stream":
+            if args.child: _bench_stream_child(args.child, args.url)
+            else: bench_stream(args.n or 200_000)
+        return
+    if args.cmd == "backfill":
+        sys.exit(run_backfill_cli(args.date_from, args.date_to, args.workers, args.force))
+    if args.cmd == "tiles":
+        sys.exit(run_tiles_cli(args.action, args.layer, args.zmin, args.zmax, args.workers))
+    if args.cmd == "assets":
+        sys.exit(run_assets_cli(args.check, args.force))
+    if args.cmd == "daemon":
+        sys.exit(run_daemon_cli(args.backfill_days, args.backfill_hours, args.workers, args.once))
+    register_map_scheme()
+    app = QApplication(sys.argv[:1])
     if not QIcon.themeName(): QIcon.setThemeName("breeze")
     w = MainWindow(); w.resize(1280,820); w.show(); sys.exit(app.exec())
 
@@ -0,0 +1,87 @@
+import json
+import os
+import sys
+import threading
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import deprem
+
+
+class StandIn:
+    """Yanıtları sırayla verilen yerel API sunucusu; (durum, başlıklar, gövde) ya da istek başlıklarını alan bir işlev."""
+    def __init__(self):
+        self.responses = []; self.requests = []
+        owner = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                owner.requests.append(dict(self.headers))
+                resp = owner.responses.pop(0) if len(owner.responses) > 1 else owner.responses[0]
+                status, headers, body = resp(self.headers) if callable(resp) else resp
+                data = json.dumps(body).encode("utf-8") if body is not None else b""
+                self.send_response(status)
+                for k, v in headers.items(): self.send_header(k, v)
+                self.send_header("Content-Length", str(len(data))); self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler); self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/api"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown(); self.server.server_close()
+
+
+class ApiClientTest(unittest.TestCase):
+    def setUp(self):
+        self.srv = StandIn()
+        self.client = deprem.ApiClient(timeout=5, retries=3, backoff=0.01, backoff_max=0.02)
+
+    def tearDown(self):
+        self.srv.close()
+
+    def test_not_modified_returns_cached_result(self):
+        items = [{"earthquake_id": "a", "mag": 4.1}]
+        def conditional(headers):
+            if headers.get("If-None-Match") == '"v1"': return 304, {"ETag": '"v1"'}, None
+            return 200, {"ETag": '"v1"'}, {"status": True, "result": items}
+        self.srv.responses = [conditional]
+        self.assertEqual(self.client.get_result(self.srv.url), items)
+        self.assertFalse(self.client.last_call.not_modified)
+        self.assertEqual(self.client.get_result(self.srv.url), items)
+        self.assertTrue(self.client.last_call.not_modified)
+        self.assertEqual(self.client.last_call.status, 304)
+
+    def test_retries_transient_errors(self):
+        self.srv.responses = [(503, {}, None), (503, {}, None), (200, {}, {"result": [{"earthquake_id": "b"}]})]
+        self.assertEqual(self.client.get_result(self.srv.url), [{"earthquake_id": "b"}])
+        self.assertEqual(self.client.last_call.attempts, 3)
+        self.assertEqual(len(self.srv.requests), 3)
+
+    def test_client_error_fails_fast(self):
+        self.srv.responses = [(404, {}, None)]
+        with self.assertRaises(deprem.ApiError):
+            self.client.get_result(self.srv.url)
+        self.assertEqual(len(self.srv.requests), 1)
+
+    def test_empty_result_is_not_an_error(self):
+        self.srv.responses = [(200, {}, {"status": True, "httpStatus": 200, "result": []})]
+        self.assertEqual(self.client.get_result(self.srv.url), [])
+        self.assertEqual(list(self.client.stream_result(self.srv.url)), [])
+
+    def test_error_body_raises(self):
+        for body in ({"status": False, "httpStatus": 500, "desc": "hata"}, {"status": True, "result": None}):
+            self.srv.responses = [(200, {}, body)]
+            with self.assertRaises(deprem.ApiError):
+                self.client.get_result(self.srv.url)
+            with self.assertRaises(deprem.ApiError):
+                list(self.client.stream_result(self.srv.url))
+
+
+if __name__ == "__main__":
+    unittest.main()
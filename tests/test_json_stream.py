@@ -0,0 +1,87 @@
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import deprem
+
+
+def split_at(data: bytes, *cuts: int):
+    """data'yı verilen bayt konumlarından parçalara böler."""
+    bounds = [0, *cuts, len(data)]
+    return [data[a:b] for a, b in zip(bounds, bounds[1:])]
+
+
+class JsonResultStreamTest(unittest.TestCase):
+    BODY = {"status": True, "httpStatus": 200, "desc": "", "result": [
+        {"earthquake_id": "a1", "mag": 4.25, "depth": -7, "lat": 3.9e1, "lon": 2.7E+1, "ok": True, "x": None},
+        {"earthquake_id": "b2", "title": "ÇANAKKALE \"EGE\" \\ \n\tç ☃ \U0001F30B", "mag": 0, "nested": {"a": [1, {"b": "]}"}]}},
+        {"earthquake_id": "c3", "mag": 12345678901234567890, "neg": -0.5e-3},
+    ], "metadata": {"count": 3}}
+
+    def decode(self, chunks):
+        return list(deprem.JsonResultStream(chunks))
+
+    def test_every_single_split_point(self):
+        data = json.dumps(self.BODY, ensure_ascii=False).encode("utf-8")
+        for cut in range(1, len(data)):
+            self.assertEqual(self.decode(split_at(data, cut)), self.BODY["result"], cut)
+
+    def test_one_byte_chunks(self):
+        for ascii_only in (True, False):
+            data = json.dumps(self.BODY, ensure_ascii=ascii_only).encode("utf-8")
+            self.assertEqual(self.decode([data[i:i+1] for i in range(len(data))]), self.BODY["result"])
+
+    def test_number_split_before_exponent_or_fraction(self):
+        # "4." / "25" ve "1" / "e3": parça sonundaki sayı tamamlanmış görünse de devamı beklenir
+        data = b'{"result": [{"m": 4.25, "e": 1e3}, 7]}'
+        for piece in (b"4.", b"1"):
+            cut = data.index(piece) + len(piece)
+            self.assertEqual(self.decode(split_at(data, cut)), [{"m": 4.25, "e": 1000.0}, 7])
+        self.assertEqual(self.decode(split_at(data, data.index(b"7") + 1)), [{"m": 4.25, "e": 1000.0}, 7])
+
+    def test_escapes_and_multibyte_split(self):
+        items = [{"t": 'a"b\\c/üğ🌋\b\f\n\r\t'}]
+        data = json.dumps({"result": items}, ensure_ascii=False).encode("utf-8")
+        for cut in range(1, len(data)):
+            self.assertEqual(self.decode(split_at(data, cut)), [json.loads(json.dumps(items[0]))], cut)
+        data = json.dumps({"result": items}).encode("ascii")  # \uXXXX kaçışları da bölünür
+        for cut in range(1, len(data)):
+            self.assertEqual(self.decode(split_at(data, cut)), [json.loads(json.dumps(items[0]))], cut)
+
+    def test_top_level_list_and_empty_result(self):
+        self.assertEqual(self.decode([b'[{"a": 1}, ', b'{"a": 2}]']), [{"a": 1}, {"a": 2}])
+        self.assertEqual(self.decode([b'{"status": true, "result": [', b" ]}"]), [])
+        self.assertEqual(self.decode([b"[]"]), [])
+
+    def test_batches(self):
+        data = json.dumps({"result": list(range(7))}).encode()
+        self.assertEqual(list(deprem.JsonResultStream([data]).batches(3)), [[0, 1, 2], [3, 4, 5], [6]])
+
+    def test_error_bodies_raise(self):
+        for body in ({"status": False, "httpStatus": 500, "desc": "hata", "result": None},
+                     {"status": False, "httpStatus": 500, "desc": "hata"},
+                     {"status": True, "result": None},
+                     {"status": True, "result": {"a": 1}},
+                     {"status": True, "result": "x"}):
+            data = json.dumps(body).encode()
+            with self.assertRaises(deprem.ApiError, msg=body):
+                self.decode(split_at(data, len(data) // 2))
+
+    def test_truncated_input_raises(self):
+        data = json.dumps(self.BODY).encode()
+        # Son öğeden sonraki ']' yoksa akış tamamlanmamıştır; her kesim noktası hata vermeli
+        end = data.index(b"]", data.index(b'"c3"'))
+        for cut in range(1, end + 1):
+            with self.assertRaises(deprem.ApiError, msg=cut):
+                self.decode([data[:cut]])
+
+    def test_garbage_raises(self):
+        for data in (b'{"result": [1 2]}', b'{"result" [1]}', b'{"result": [1,]}', b"<html>", b""):
+            with self.assertRaises(deprem.ApiError, msg=data):
+                self.decode([data])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import deprem
+
+
+class TileServer:
+    """Yerel karo kaynağı: /<z>/<x>/<y>.png için yola özgü PNG baytları; fail=True iken 503."""
+    def __init__(self):
+        self.hits = 0; self.fail = False
+        owner = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                owner.hits += 1
+                if owner.fail:
+                    self.send_error(503); return
+                data = b"\x89PNG" + self.path.encode("ascii")
+                self.send_response(200); self.send_header("Content-Length", str(len(data))); self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler); self.server.daemon_threads = True
+        self.template = f"http://127.0.0.1:{self.server.server_address[1]}/{{z}}/{{x}}/{{y}}.png"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown(); self.server.server_close()
+
+
+class TileProxyTest(unittest.TestCase):
+    def setUp(self):
+        self.td = tempfile.mkdtemp()
+        self.upstream = TileServer()
+        self.proxy = deprem.TileProxy(deprem.TileCache(os.path.join(self.td, "tiles.db")), {"t": self.upstream.template}, timeout=5).start()
+
+    def tearDown(self):
+        self.proxy.close(); self.upstream.close()
+        shutil.rmtree(self.td, ignore_errors=True)
+
+    def get(self, path: str) -> requests.Response:
+        return requests.get(f"http://127.0.0.1:{self.proxy.port}{path}", timeout=5)
+
+    def test_miss_then_hit(self):
+        first = self.get("/tiles/t/3/4/2.png"); second = self.get("/tiles/t/3/4/2.png")
+        self.assertEqual((first.status_code, second.status_code), (200, 200))
+        self.assertEqual(first.content, b"\x89PNG/3/4/2.png")
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(self.upstream.hits, 1)
+        self.assertEqual((self.proxy.cache.misses, self.proxy.cache.hits), (1, 1))
+
+    def test_upstream_failure_is_502(self):
+        self.upstream.fail = True
+        self.assertEqual(self.get("/tiles/t/3/4/2.png").status_code, 502)
+        self.assertEqual(self.proxy.cache.stats()["tiles"], 0)
+
+    def test_bad_requests_are_404(self):
+        for path in ("/foo", "/tiles/t/3/4", "/tiles/t/a/b/c.png", "/tiles/t/2/9/0.png", "/tiles/t/23/0/0.png", "/tiles/yok/1/0/0.png"):
+            self.assertEqual(self.get(path).status_code, 404, path)
+        self.assertEqual(self.upstream.hits, 0)
+
+    def test_prefetch_skips_cached_tiles(self):
+        first = deprem.prefetch_tiles(self.proxy, "t", 3, 5)
+        self.assertGreater(first["total"], 0)
+        self.assertEqual((first["fetched"], first["cached"], first["failed"]), (first["total"], 0, 0))
+        hits = self.upstream.hits
+        second = deprem.prefetch_tiles(self.proxy, "t", 3, 5)
+        self.assertEqual((second["fetched"], second["cached"]), (0, second["total"]))
+        self.assertEqual(self.upstream.hits, hits)
+
+
+class TileCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.td = tempfile.mkdtemp()
+        self.cache = deprem.TileCache(os.path.join(self.td, "tiles.db"), max_bytes=10_000)
+
+    def tearDown(self):
+        self.cache.close(); shutil.rmtree(self.td, ignore_errors=True)
+
+    def test_lru_eviction_to_ninety_percent(self):
+        for i in range(9): self.cache.put("t", 10, i, 0, bytes(1000))
+        # Erişim sırası: 0 en eski; sonra 0 okunur ve en yeni olur
+        for i in range(9):
+            self.cache._con.execute("UPDATE tiles SET last_access = ? WHERE tile_column = ?", (i + 1, i))
+        self.assertIsNotNone(self.cache.get("t", 10, 0, 0))
+        self.cache.put("t", 10, 9, 0, bytes(1000)); self.cache.put("t", 10, 10, 0, bytes(1000))
+        st = self.cache.stats()
+        self.assertEqual(st["bytes"], 9000)
+        self.assertEqual(st["tiles"], 9)
+        self.assertEqual(self.cache.evicted, 2)
+        self.assertIsNotNone(self.cache.get("t", 10, 0, 0))
+        self.assertIsNone(self.cache.get("t", 10, 1, 0))
+        self.assertIsNone(self.cache.get("t", 10, 2, 0))
+        self.assertIsNotNone(self.cache.get("t", 10, 3, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()